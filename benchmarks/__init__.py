@@ -0,0 +1,59 @@
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+
+def timeit(name: str, count: int, fn: Callable[[int], None]) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else float("inf")
+    print(f"{name:<40} {count:>8} msgs {elapsed:>8.3f}s {rate:>12.1f} msgs/sec")
+    return rate
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0
+
+
+def measure(
+    name: str, count: int, fn: Callable[[int], None], traced: int = 100
+) -> Dict[str, float]:
+    """Like timeit, also reporting p50/p99 latency per call and the memory
+    allocated per call. Allocations are traced over ``traced`` further calls,
+    numbered from count, since tracing slows every allocation down."""
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for i in range(count):
+        began = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+
+    peaks: List[int] = []
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(count, count + traced):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(i)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    stats = {
+        "rate": count / elapsed if elapsed else float("inf"),
+        "p50": percentile(latencies, 0.5) * 1e6,
+        "p99": percentile(latencies, 0.99) * 1e6,
+        "alloc": sum(peaks) / len(peaks) / 1024 if peaks else 0,
+        "retained": retained / traced / 1024 if traced else 0,
+    }
+    print(
+        f"{name:<32} {count:>8} msgs {stats['rate']:>10.1f} msgs/sec"
+        f" p50 {stats['p50']:>9.1f}us p99 {stats['p99']:>9.1f}us"
+        f" alloc {stats['alloc']:>8.1f}KiB/msg"
+        f" retained {stats['retained']:>7.2f}KiB/msg"
+    )
+    return stats
@@ -0,0 +1,72 @@
+"""Encode and decode throughput of each codec on argument artifacts, and of
+each compressor on top of the json codec.
+
+Codecs and compressors whose package is not installed are skipped. Run from
+the repository root with ``python -m benchmarks.codec [count]``.
+"""
+
+import sys
+from typing import Any, Dict
+
+from benchmarks import timeit
+from servc.svc.codec import (
+    CODECS,
+    COMPRESSORS,
+    Serializer,
+    get_codec,
+    get_compressor,
+)
+from servc.svc.io.input import ArgumentArtifact
+
+
+def artifact(rows: int) -> ArgumentArtifact:
+    return {
+        "method": "benchmark",
+        "inputs": {
+            "rows": [
+                {
+                    "id": i,
+                    "name": f"row-{i}",
+                    "value": i * 0.5,
+                    "tags": ["a", "b", "c"],
+                    "nested": {"flag": i % 2 == 0, "missing": None},
+                }
+                for i in range(rows)
+            ]
+        },
+    }
+
+
+ARTIFACTS: Dict[str, Any] = {
+    "small (10 rows)": artifact(10),
+    "large (20k rows)": artifact(20000),
+}
+
+
+def main(count: int = 100):
+    for label, value in ARTIFACTS.items():
+        print(label)
+        for name in CODECS:
+            try:
+                codec = get_codec(name)
+            except ImportError:
+                print(f"  {name}: not installed")
+                continue
+            data = codec.dumps(value)
+            print(f"  {name}: {len(data)} bytes")
+            timeit(f"  {name} encode", count, lambda _: codec.dumps(value))
+            timeit(f"  {name} decode", count, lambda _: codec.loads(data))
+        for name in COMPRESSORS:
+            try:
+                serializer = Serializer(get_codec(), get_compressor(name), 1)
+            except ImportError:
+                print(f"  json+{name}: not installed")
+                continue
+            data = serializer.dumps(value)
+            print(f"  json+{name}: {len(data)} bytes")
+            timeit(f"  json+{name} encode", count, lambda _: serializer.dumps(value))
+            timeit(f"  json+{name} decode", count, lambda _: serializer.loads(data))
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:2]])
@@ -0,0 +1,64 @@
+"""Fan-out cost of splitting a job into parts: one sendMessage per part versus
+a single sendMessages batch, as used by the parallelize pre-hook.
+
+Needs Redis and RabbitMQ at conf.cache.url and conf.bus.url. Run from the
+repository root with ``python -m benchmarks.fanout [parts ...]``.
+"""
+
+import sys
+import time
+from typing import List
+
+from servc.svc.client.send import sendMessage, sendMessages
+from servc.svc.com.bus.rabbitmq import BusRabbitMQ
+from servc.svc.com.cache.redis import CacheRedis
+from servc.svc.config import Config
+from servc.svc.idgen.simple import simple
+from servc.svc.io.input import InputPayload, InputType
+
+ROUTE = "benchmark-fanout"
+
+
+def parts(count: int) -> List[InputPayload]:
+    return [
+        {
+            "id": "benchmark-parent",
+            "type": InputType.INPUT.value,
+            "route": ROUTE,
+            "force": True,
+            "argumentId": "",
+            "argument": {"method": "benchmark", "inputs": {"part": i}},
+        }
+        for i in range(count)
+    ]
+
+
+def main(sizes: List[int]):
+    config = Config()
+    bus = BusRabbitMQ(config.get("conf.bus"))
+    cache = CacheRedis(config.get("conf.cache"))
+
+    for size in sizes:
+        payloads = parts(size)
+        for name, send in (
+            (
+                "sendMessage per part",
+                lambda: [sendMessage(x, bus, cache, simple) for x in payloads],
+            ),
+            ("sendMessages batch", lambda: sendMessages(payloads, bus, cache, simple)),
+        ):
+            bus.delete_queue(ROUTE)
+            bus.create_queue(ROUTE, False)
+            start = time.perf_counter()
+            send()
+            elapsed = time.perf_counter() - start
+            rate = size / elapsed
+            print(f"{name:<24} {size:>8} parts {elapsed:>8.3f}s {rate:>10.1f}/sec")
+
+    bus.delete_queue(ROUTE)
+    bus.close()
+    cache.close()
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,56 @@
+"""Publishing throughput of a fresh bus per message versus a reused publisher.
+
+Needs a broker reachable at conf.bus.url (BUS_URL). Run from the repository
+root with ``python -m benchmarks.publisher [count]``.
+"""
+
+import sys
+
+from benchmarks import timeit
+from servc.svc.com.bus.rabbitmq import BusRabbitMQ
+from servc.svc.com.cache.redis import CacheRedis
+from servc.svc.com.worker import WorkerComponent
+from servc.svc.config import Config
+
+ROUTE = "benchmark-publisher"
+
+
+def main(count: int = 1000):
+    config = Config()
+    busConfig = config.get("conf.bus")
+    admin = BusRabbitMQ(busConfig)
+    admin.delete_queue(ROUTE)
+    admin.create_queue(ROUTE, False)
+
+    def fresh(i: int):
+        bus = BusRabbitMQ(busConfig)
+        message = {"type": "input", "route": ROUTE, "i": i}
+        bus.publishMessage(ROUTE, message)  # type: ignore
+        bus.close()
+
+    worker = WorkerComponent(
+        {},
+        {},
+        None,
+        admin,
+        BusRabbitMQ,
+        CacheRedis(config.get("conf.cache")),
+        config,
+    )
+
+    def reused(i: int):
+        worker.getPublisher().publishMessage(
+            ROUTE, {"type": "input", "route": ROUTE, "i": i}  # type: ignore
+        )
+
+    before = timeit("new bus per message", count, fresh)
+    after = timeit("worker publisher", count, reused)
+    print(f"speedup: {after / before:.1f}x")
+
+    worker.close()
+    admin.delete_queue(ROUTE)
+    admin.close()
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:2]])
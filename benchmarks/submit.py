@@ -0,0 +1,53 @@
+"""Submissions per second of separate cache calls versus one submit script.
+
+Needs Redis reachable at conf.cache.url (CACHE_URL). Nothing is published, so
+no broker is required. Run from the repository root with
+``python -m benchmarks.submit [count]``.
+"""
+
+import sys
+
+from benchmarks import timeit
+from servc.svc.client.send import isCompleted
+from servc.svc.com.cache.redis import CacheRedis
+from servc.svc.config import Config
+from servc.svc.io.response import getProgressArtifact
+
+PREFIX = "benchmark-submit"
+
+
+def main(count: int = 1000):
+    config = Config()
+    cache = CacheRedis(config.get("conf.cache"))
+    argument = {"method": "benchmark", "inputs": list(range(100))}
+
+    def separate(i: int):
+        id = f"{PREFIX}-separate-{i}"
+        if isCompleted(cache.getKey(id)):
+            return
+        cache.setKey(f"{id}-arg", argument, cache.argumentTTL)
+        cache.setKey(id, getProgressArtifact(id, 0, "Starting"), cache.progressTTL)
+
+    def submit(i: int):
+        id = f"{PREFIX}-submit-{i}"
+        cache.submit(
+            id, {f"{id}-arg": argument}, getProgressArtifact(id, 0, "Starting")
+        )
+
+    before = timeit("getKey + setKey calls", count, separate)
+    after = timeit("submit script", count, submit)
+    print(f"speedup: {after / before:.1f}x")
+
+    cache.deleteKeys(
+        [
+            f"{PREFIX}-{kind}-{i}{suffix}"
+            for kind in ["separate", "submit"]
+            for i in range(count)
+            for suffix in ["", "-arg"]
+        ]
+    )
+    cache.close()
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:2]])
@@ -0,0 +1,112 @@
+"""End-to-end throughput of the client and worker paths against the in-memory
+bus and cache, so the framework's own overhead is measured without a broker.
+
+Reports msgs/sec, p50/p99 latency and allocations per message for:
+
+- sendMessage: submitting a job and publishing it
+- inputProcessor: a worker resolving a queued message
+- end to end: sendMessage, a subscribed worker and pollMessage
+- parallelize: a job split into parts by the part hook and reduced
+
+Run from the repository root with
+``python -m benchmarks.throughput [count] [parts] [concurrency]``.
+"""
+
+import sys
+import threading
+from typing import Any, List
+
+from benchmarks import measure
+from servc.svc.client.poll import pollMessage
+from servc.svc.client.send import sendMessage
+from servc.svc.com.bus.memory import BusMemory
+from servc.svc.com.cache.memory import CacheMemory
+from servc.svc.com.worker import WorkerComponent
+from servc.svc.com.worker.types import RESOLVER_MAPPING
+from servc.svc.config import Config
+from servc.svc.idgen.simple import simple
+from servc.svc.io.input import InputPayload, InputType
+
+ROUTE = "benchmark-throughput"
+
+
+def main(count: int = 1000, parts: int = 10, concurrency: int = 1):
+    config = Config()
+    config.setValue("conf.bus.url", "memory://benchmark")
+    config.setValue("conf.bus.route", ROUTE)
+    config.setValue("conf.cache.url", "memory://benchmark")
+    config.setValue("conf.worker.concurrency", concurrency)
+
+    resolvers: RESOLVER_MAPPING = {
+        "echo": lambda _id, inputs, _c: inputs,
+        "sum": lambda _id, inputs, _c: sum(inputs),
+        "sum_part": lambda _id, artifact, _c: [
+            artifact["inputs"][i::parts] for i in range(parts)
+        ],
+        "sum_reduce": lambda _id, results, _c: sum(
+            x["responseBody"] for x in results if x
+        ),
+    }
+    bus = BusMemory(config.get("conf.bus"))
+    cache = CacheMemory(config.get("conf.cache"))
+    worker = WorkerComponent(resolvers, {}, None, bus, BusMemory, cache, config)
+
+    def payload(method: str, inputs: Any) -> InputPayload:
+        return {
+            "type": InputType.INPUT.value,
+            "route": ROUTE,
+            "argumentId": "",
+            "argument": {"method": method, "inputs": inputs},
+        }
+
+    # client side only, the queue fills up and is dropped afterwards
+    bus.create_queue(ROUTE, False)
+    measure(
+        "sendMessage",
+        count,
+        lambda i: sendMessage(payload("echo", [i]), bus, cache, simple),
+    )
+    bus.delete_queue(ROUTE)
+
+    # worker side only, the arguments are written up front
+    messages: List[InputPayload] = []
+    arguments = {}
+    for i in range(count + 100):
+        messages.append(
+            {
+                "id": f"{ROUTE}-{i}",
+                "type": InputType.INPUT.value,
+                "route": ROUTE,
+                "argumentId": f"{ROUTE}-arg-{i}",
+            }
+        )
+        arguments[f"{ROUTE}-arg-{i}"] = {"method": "echo", "inputs": [i]}
+    cache.setKeys(arguments)
+    measure("inputProcessor", count, lambda i: worker.inputProcessor(messages[i]))
+
+    # both sides, with the worker consuming on its own thread. the queue is
+    # declared first, messages published to undeclared queues are dropped
+    bus.create_queue(ROUTE, False)
+    consumer = threading.Thread(target=worker.connect, daemon=True)
+    consumer.start()
+
+    def roundtrip(method: str, inputs: Any):
+        id = sendMessage(payload(method, inputs), bus, cache, simple)
+        pollMessage(id, cache)
+
+    measure("end to end", count, lambda i: roundtrip("echo", [i, "e2e"]))
+    measure(
+        f"parallelize ({parts} parts)",
+        max(1, count // parts),
+        lambda i: roundtrip("sum", list(range(i, i + parts * 10))),
+        traced=10,
+    )
+
+    worker.close()
+    bus.close()
+    consumer.join()
+    bus.delete_queue(ROUTE)
+
+
+if __name__ == "__main__":
+    main(*[int(x) for x in sys.argv[1:4]])
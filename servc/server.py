@@ -1,4 +1,3 @@
-from multiprocessing import Process
 from typing import List
 
 from servc.svc import Middleware
@@ -7,8 +6,11 @@ from servc.svc.com.bus.rabbitmq import BusRabbitMQ
 from servc.svc.com.cache import CacheComponent
 from servc.svc.com.cache.redis import CacheRedis
 from servc.svc.com.http import HTTPInterface
+from servc.svc.com.storage.blob import BlobStorage
 from servc.svc.com.worker import RESOLVER_MAPPING, WorkerComponent
+from servc.svc.com.worker.pool import ConsumerPool
 from servc.svc.config import Config
+from servc.svc.tracing import setupTracing
 
 
 def blankOnConsuming(route: str):
@@ -18,6 +20,14 @@ def blankOnConsuming(route: str):
 COMPONENT_ARRAY = List[type[Middleware]]
 
 
+def bindOffloadStorage(cache: CacheComponent, components: List[Middleware]):
+    # large cache values are offloaded to the first blob storage component
+    for component in components:
+        if isinstance(component, BlobStorage):
+            cache.setOffloadStorage(component)
+            return
+
+
 def start_consumer(
     configDictionary: dict,
     resolver: RESOLVER_MAPPING,
@@ -31,8 +41,11 @@ def start_consumer(
 ):
     config = configClass()
     config.setAll(configDictionary)
+    setupTracing(config)
     bus = busClass(config.get(f"conf.{busClass.name}"))
     cache = cacheClass(config.get(f"conf.{cacheClass.name}"))
+    otherComponents = [X(config.get(f"conf.{X.name}")) for X in components]
+    bindOffloadStorage(cache, otherComponents)
 
     consumer = workerClass(
         resolver,
@@ -42,7 +55,7 @@ def start_consumer(
         busClass,
         cache,
         config,
-        [X(config.get(f"conf.{X.name}")) for X in components],
+        otherComponents,
     )
     consumer.connect()
 
@@ -59,14 +72,18 @@ def start_server(
     onConsuming: OnConsuming = blankOnConsuming,
     components: COMPONENT_ARRAY = [],
     start=True,
+    workers: int | None = None,
 ):
     config = configClass()
     if route is not None:
         config.setValue("conf.bus.route", route)
+    if workers is not None:
+        config.setValue("conf.worker.processes", workers)
+    setupTracing(config)
 
-    consumer = Process(
-        target=start_consumer,
-        args=(
+    consumer = ConsumerPool(
+        start_consumer,
+        (
             config.getAll(),
             resolver,
             eventResolver,
@@ -77,12 +94,15 @@ def start_server(
             onConsuming,
             components,
         ),
-        daemon=True,
+        int(config.get("conf.worker.processes") or 1),
     )
     consumer.start()
 
     bus = busClass(config.get(f"conf.{busClass.name}"))
     cache = cacheClass(config.get(f"conf.{cacheClass.name}"))
+    otherComponents = [X(config.get(f"conf.{X.name}")) for X in components]
+    bindOffloadStorage(cache, otherComponents)
+
     http = httpClass(
         config.get(f"conf.{httpClass.name}"),
         bus,
@@ -90,7 +110,7 @@ def start_server(
         consumer,
         resolver,
         eventResolver,
-        [X(config.get(f"conf.{X.name}")) for X in components],
+        otherComponents,
     )
     if start:
         http.start()
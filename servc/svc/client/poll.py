@@ -1,19 +1,48 @@
 import time
+from typing import Iterator
 
 from servc.svc.client.get import get_result
 from servc.svc.com.cache import CacheComponent
 from servc.svc.io.output import ResponseArtifact
 
+POLL_MIN_DELAY = 0.05
 
-def pollMessage(id: str, cache: CacheComponent, timeout: int = 30) -> ResponseArtifact:
-    result = get_result(id, cache)
-    start = time.time()
+POLL_MAX_DELAY = 1
 
-    while True:
-        if result["progress"] == 100:
-            return result
 
-        if timeout and time.time() - start > timeout:
-            raise Exception("Timeout")
-        time.sleep(1)
+def watchResult(
+    id: str, cache: CacheComponent, timeout: float = 30
+) -> Iterator[ResponseArtifact]:
+    """
+    Yields the result of a job every time it changes, until it completes or
+    the timeout, in seconds, passes. A timeout of 0 waits forever.
+    """
+    # the key is watched before it is first read, so a result announced in
+    # between is not missed, and one subscription serves the whole watch
+    with cache.watchKey(id) as watch:
         result = get_result(id, cache)
+        start = time.time()
+        delay = POLL_MIN_DELAY
+        yield result
+
+        while result["progress"] != 100:
+            elapsed = time.time() - start
+            if timeout and elapsed > timeout:
+                return
+
+            # wake up as soon as the result is announced. when no notification
+            # arrives, back off so idle jobs are not polled too aggressively
+            if not watch.wait(min(delay, timeout - elapsed) if timeout else delay):
+                delay = min(delay * 2, POLL_MAX_DELAY)
+            latest = get_result(id, cache)
+            if latest != result:
+                result = latest
+                yield result
+
+
+def pollMessage(id: str, cache: CacheComponent, timeout: int = 30) -> ResponseArtifact:
+    for result in watchResult(id, cache, timeout):
+        pass
+    if result["progress"] != 100:
+        raise Exception("Timeout")
+    return result
@@ -1,24 +1,27 @@
-from typing import List
+import time
+from typing import Any, Dict, List
 
 from servc.svc import Middleware
 from servc.svc.com.bus import BusComponent
 from servc.svc.com.cache import CacheComponent
 from servc.svc.idgen import ID_GENERATOR
-from servc.svc.io.input import InputPayload, InputType
+from servc.svc.io.input import EventPayload, InputPayload, InputType
+from servc.svc.io.response import getProgressArtifact
+from servc.svc.metrics import SEND_SECONDS, SENT, boundLabel
+from servc.svc.tracing import annotate, inject, span, traced
 
 
-def sendMessage(
+def getMessageId(
     message: InputPayload,
     bus: BusComponent,
     cache: CacheComponent,
     idGenerator: ID_GENERATOR,
-    force: bool = False,
     services: List[Middleware] = [],
 ) -> str:
     if "argument" not in message:
         raise Exception("InputPayload must have inputs")
 
-    id = (
+    return (
         idGenerator(
             "-".join(["svc", message["route"]]),
             [bus, cache, *services],
@@ -27,24 +30,38 @@ def sendMessage(
         if "id" not in message or message["id"] in ["", None]
         else message["id"]
     )
-    if force or message.get("force", False):
-        cache.deleteKey(id)
-    response = cache.getKey(id)
-
-    if (
-        response
-        and response["progress"] > 0
-        and (not response["isError"])
-        and force is False
-    ):
-        return id
 
+
+def isCompleted(response: Any | None) -> bool:
+    return bool(response and response["progress"] > 0 and (not response["isError"]))
+
+
+def getMethodName(message: InputPayload) -> str:
+    argument = message.get("argument")
+    return str(argument.get("method", "")) if isinstance(argument, dict) else ""
+
+
+def getMethodLabel(message: InputPayload) -> str:
+    # method names come from callers, so the label is capped
+    return boundLabel("method", getMethodName(message))
+
+
+def getInputObject(
+    message: InputPayload,
+    id: str,
+    bus: BusComponent,
+    cache: CacheComponent,
+    idGenerator: ID_GENERATOR,
+    services: List[Middleware],
+    arguments: Dict[str, Any],
+) -> InputPayload:
     inputObject: InputPayload = {
         "type": InputType.INPUT.value,
         "route": message["route"],
         "argumentId": message["argumentId"] if "argumentId" in message else "",
         "id": id,
         "argument": message["argument"],
+        "sentAt": time.time(),
     }
 
     if "instanceId" in message and message["instanceId"]:
@@ -57,10 +74,102 @@ def sendMessage(
             [bus, cache, *services],
             message["argument"],
         )
-        cache.setKey(argumentId, message["argument"])
+        arguments[argumentId] = message["argument"]
         inputObject["argumentId"] = argumentId
         del inputObject["argument"]
 
-    bus.publishMessage(message["route"], inputObject)
+    return inputObject
+
+
+@traced("sendMessage")
+def sendMessage(
+    message: InputPayload,
+    bus: BusComponent,
+    cache: CacheComponent,
+    idGenerator: ID_GENERATOR,
+    force: bool = False,
+    services: List[Middleware] = [],
+) -> str:
+    started = time.perf_counter()
+    labels = message["route"], getMethodLabel(message)
+    id = getMessageId(message, bus, cache, idGenerator, services)
+    isForced = force or message.get("force", False)
+    annotate(
+        {
+            "servc.route": message["route"],
+            "servc.method": getMethodName(message),
+            "servc.id": id,
+        }
+    )
+
+    arguments: Dict[str, Any] = {}
+    inputObject = getInputObject(
+        message, id, bus, cache, idGenerator, services, arguments
+    )
+    progress = getProgressArtifact(id, 0, "Starting")
+    response = cache.submit(id, arguments, progress, isForced)
+
+    # an existing response that failed or never started is submitted again
+    if response is not None:
+        if isCompleted(response) and force is False:
+            SEND_SECONDS.labels(*labels).observe(time.perf_counter() - started)
+            return id
+        cache.submit(id, arguments, progress, True)
+
+    # the consumer continues the trace from the publishing span
+    with span("publishMessage", attributes={"servc.route": message["route"]}):
+        inject(inputObject)
+        bus.publishMessage(message["route"], inputObject)
+    SENT.labels(*labels).inc()
+    SEND_SECONDS.labels(*labels).observe(time.perf_counter() - started)
 
     return id
+
+
+@traced("sendMessages")
+def sendMessages(
+    messages: List[InputPayload],
+    bus: BusComponent,
+    cache: CacheComponent,
+    idGenerator: ID_GENERATOR,
+    force: bool = False,
+    services: List[Middleware] = [],
+) -> List[str]:
+    """
+    Bulk version of sendMessage. Ids are computed locally, then the cache
+    is hit once to clear forced ids, once to look up existing responses and
+    once each to write every argument and initial progress, and each route is
+    published as one batch.
+    """
+    ids = [getMessageId(x, bus, cache, idGenerator, services) for x in messages]
+    forced = [force or x.get("force", False) for x in messages]
+
+    cache.deleteKeys(list({id for id, f in zip(ids, forced) if f}))
+    lookup = list({id for id, f in zip(ids, forced) if not f})
+    responses = dict(zip(lookup, cache.getKeys(lookup)))
+
+    arguments: Dict[str, Any] = {}
+    progress: Dict[str, Any] = {}
+    batches: Dict[str, List[InputPayload | EventPayload]] = {}
+    for message, id, isForced in zip(messages, ids, forced):
+        if not isForced and isCompleted(responses.get(id)) and force is False:
+            continue
+
+        inputObject = getInputObject(
+            message, id, bus, cache, idGenerator, services, arguments
+        )
+        progress[id] = getProgressArtifact(id, 0, "Starting")
+        batches.setdefault(message["route"], []).append(inputObject)
+        SENT.labels(message["route"], getMethodLabel(message)).inc()
+
+    if len(arguments):
+        cache.setKeys(arguments, cache.argumentTTL)
+    if len(progress):
+        cache.setKeys(progress, cache.progressTTL)
+    for route, batch in batches.items():
+        with span("publishMany", attributes={"servc.route": route}):
+            for payload in batch:
+                inject(payload)
+            bus.publishMany(route, batch)
+
+    return ids
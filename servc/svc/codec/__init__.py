@@ -0,0 +1,221 @@
+import datetime
+import decimal
+import json
+import zlib
+from typing import Any, Dict
+
+import simplejson
+
+from servc.svc.config import Config
+
+# encoded payloads other than plain json start with a null byte, which can
+# never begin a json document, followed by one byte naming the codec. this
+# lets old and new payloads coexist while a codec change is rolled out
+TAG_MARKER = b"\x00"
+
+
+def decimal_default(obj: Any) -> None | str | float:
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    return None
+
+
+class Codec:
+    name: str = "json"
+
+    contentType: str = "application/json"
+
+    tag: bytes = b""
+
+    def encode(self, value: Any) -> bytes:
+        return simplejson.dumps(value, default=decimal_default, ignore_nan=True).encode(
+            "utf-8"
+        )
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+    def dumps(self, value: Any) -> bytes:
+        return b"".join([self.tag, self.encode(value)])
+
+    def loads(self, data: bytes | str) -> Any:
+        """
+        Decodes a payload written by any codec, reading its tag to pick the
+        decoder. Untagged payloads are json.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if data[:1] != TAG_MARKER:
+            return (get_codec() if self.tag else self).decode(data)
+        if data[:2] == self.tag:
+            return self.decode(data[2:])
+        for name, codec in CODECS.items():
+            if codec.tag == data[:2]:
+                return get_codec(name).decode(data[2:])
+        raise ValueError(f"Unknown codec tag: {data[:2]!r}")
+
+
+class ORJSONCodec(Codec):
+    # orjson writes plain json, so payloads stay untagged and readable by
+    # consumers that predate the codec setting
+    name = "orjson"
+
+    def __init__(self):
+        import orjson  # type: ignore
+
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def encode(self, value: Any) -> bytes:
+        return self._orjson.dumps(value, default=decimal_default, option=self._options)
+
+    def decode(self, data: bytes) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+
+    contentType = "application/msgpack"
+
+    tag = b"".join([TAG_MARKER, b"m"])
+
+    def __init__(self):
+        import msgpack  # type: ignore
+
+        self._msgpack = msgpack
+
+    def encode(self, value: Any) -> bytes:
+        return self._msgpack.packb(value, default=decimal_default)
+
+    def decode(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+CODECS: Dict[str, type[Codec]] = {
+    Codec.name: Codec,
+    ORJSONCodec.name: ORJSONCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+_instances: Dict[str, Codec] = {}
+
+
+def get_codec(name: str | None = None) -> Codec:
+    name = name or Codec.name
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec: {name}")
+    if name not in _instances:
+        _instances[name] = CODECS[name]()
+    return _instances[name]
+
+
+class Compressor:
+    name: str = "zlib"
+
+    tag: bytes = b"".join([TAG_MARKER, b"z"])
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, 1)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    name = "zstd"
+
+    tag = b"".join([TAG_MARKER, b"s"])
+
+    def __init__(self):
+        import zstandard  # type: ignore
+
+        self._compressor = zstandard.ZstdCompressor()
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+class LZ4Compressor(Compressor):
+    name = "lz4"
+
+    tag = b"".join([TAG_MARKER, b"l"])
+
+    def __init__(self):
+        import lz4.frame  # type: ignore
+
+        self._lz4 = lz4.frame
+
+    def compress(self, data: bytes) -> bytes:
+        return self._lz4.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._lz4.decompress(data)
+
+
+COMPRESSORS: Dict[str, type[Compressor]] = {
+    Compressor.name: Compressor,
+    ZstdCompressor.name: ZstdCompressor,
+    LZ4Compressor.name: LZ4Compressor,
+}
+
+_compressors: Dict[str, Compressor] = {}
+
+
+def get_compressor(name: str | None = None) -> Compressor:
+    name = name or Compressor.name
+    if name not in COMPRESSORS:
+        raise ValueError(f"Unknown compression: {name}")
+    if name not in _compressors:
+        _compressors[name] = COMPRESSORS[name]()
+    return _compressors[name]
+
+
+class Serializer:
+    """
+    Encodes values with a codec and compresses the payloads at or above a
+    size threshold. Compressed payloads are framed with the compressor's tag,
+    so any serializer reads them regardless of its own settings.
+    """
+
+    codec: Codec
+
+    compressor: Compressor | None
+
+    threshold: int
+
+    def __init__(
+        self, codec: Codec, compressor: Compressor | None = None, threshold: int = 0
+    ):
+        self.codec = codec
+        self.compressor = compressor
+        self.threshold = threshold
+
+    def dumps(self, value: Any) -> bytes:
+        data = self.codec.dumps(value)
+        if self.compressor and self.threshold and len(data) >= self.threshold:
+            return b"".join([self.compressor.tag, self.compressor.compress(data)])
+        return data
+
+    def loads(self, data: bytes | str) -> Any:
+        if isinstance(data, bytes) and data[:1] == TAG_MARKER:
+            for name, compressor in COMPRESSORS.items():
+                if compressor.tag == data[:2]:
+                    data = get_compressor(name).decompress(data[2:])
+                    break
+        return self.codec.loads(data)
+
+
+def get_serializer(config: Config) -> Serializer:
+    threshold = int(config.get("compressthreshold") or 0)
+    return Serializer(
+        get_codec(config.get("codec")),
+        get_compressor(config.get("compression")) if threshold > 0 else None,
+        threshold,
+    )
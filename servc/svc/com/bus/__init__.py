@@ -1,11 +1,15 @@
-from typing import Any, Callable, Dict, Union
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Union
 
 from servc.svc import ComponentType, Middleware
+from servc.svc.codec import Codec, Serializer, get_serializer
 from servc.svc.config import Config
 from servc.svc.io.input import EventPayload, InputPayload, InputType
 from servc.svc.io.output import StatusCode
+from servc.svc.tracing import inject, span
 
-InputProcessor = Callable[..., StatusCode]
+InputProcessor = Callable[..., StatusCode | Awaitable[StatusCode]]
 
 OnConsuming = Union[Callable[[str], None], None]
 
@@ -25,6 +29,10 @@ class BusComponent(Middleware):
 
     _route: str
 
+    _prefetch: int
+
+    _serializer: Serializer
+
     def __init__(self, config: Config):
         super().__init__(config)
 
@@ -32,6 +40,8 @@ class BusComponent(Middleware):
         self._prefix = str(config.get("prefix"))
         self._instanceId = str(config.get("instanceid"))
         self._route = str(config.get("route"))
+        self._prefetch = int(config.get("prefetch") or 0)
+        self._serializer = get_serializer(config)
 
         routemap = config.get("routemap")
         if routemap is None or not isinstance(routemap, dict):
@@ -46,6 +56,14 @@ class BusComponent(Middleware):
     def route(self) -> str:
         return self._route
 
+    @property
+    def codec(self) -> Codec:
+        return self._serializer.codec
+
+    @property
+    def serializer(self) -> Serializer:
+        return self._serializer
+
     def getRoute(self, route: str) -> str:
         if route in self._routeMap:
             return "".join([self._prefix, self._routeMap[route]])
@@ -55,16 +73,30 @@ class BusComponent(Middleware):
         return True
 
     def emitEvent(self, event: str, details: Any) -> bool:
-        return self.publishMessage(
-            self.getRoute(event),
-            {
-                "type": InputType.EVENT.value,
-                "route": self.getRoute(event),
-                "event": event,
-                "details": details,
-                "instanceId": self._instanceId,
-            },
-        )
+        message: EventPayload = {
+            "type": InputType.EVENT.value,
+            "route": self.getRoute(event),
+            "event": event,
+            "details": details,
+            "instanceId": self._instanceId,
+            "sentAt": time.time(),
+        }
+        with span("publishMessage", attributes={"servc.event": event}):
+            inject(message)
+            return self.publishMessage(self.getRoute(event), message)
+
+    def publishMany(
+        self, route: str, messages: List[InputPayload | EventPayload]
+    ) -> bool:
+        return all([self.publishMessage(route, message) for message in messages])
+
+    async def publishMessageAsync(
+        self, route: str, message: InputPayload | EventPayload
+    ) -> bool:
+        return await asyncio.to_thread(self.publishMessage, route, message)
+
+    async def emitEventAsync(self, event: str, details: Any) -> bool:
+        return await asyncio.to_thread(self.emitEvent, event, details)
 
     def create_queue(self, queue: str, bindEventExchange: bool) -> bool:
         return False
@@ -81,5 +113,6 @@ class BusComponent(Middleware):
         inputProcessor: InputProcessor,
         onConsuming: OnConsuming | None,
         bindEventExchange: bool,
+        concurrency: int = 1,
     ) -> bool:
         return True
@@ -1,16 +1,27 @@
 from __future__ import annotations
 
-import json
 import threading
 import time
-from typing import Any
+from functools import partial
+from typing import Any, Callable, Dict, List
 
-import simplejson
-from azure.servicebus import ServiceBusClient, ServiceBusMessage, ServiceBusReceiver
+from azure.servicebus import (
+    AutoLockRenewer,
+    ServiceBusClient,
+    ServiceBusMessage,
+    ServiceBusReceivedMessage,
+    ServiceBusReceiver,
+    ServiceBusSender,
+)
+from azure.servicebus.exceptions import (
+    MessageSizeExceededError,
+    ServiceBusConnectionError,
+)
 from azure.servicebus.management import ServiceBusAdministrationClient
 
 from servc.svc.com.bus import BusComponent, InputProcessor, OnConsuming
-from servc.svc.com.cache.redis import decimal_default
+from servc.svc.com.bus.receive import receiveLoop, resolveResult
+from servc.svc.config import Config
 from servc.svc.io.input import EventPayload, InputPayload, InputType
 from servc.svc.io.output import StatusCode
 
@@ -20,6 +31,39 @@ class AzureServiceBus(BusComponent):
 
     _conn: ServiceBusClient | None = None
 
+    _batchSize: int
+
+    _maxWait: float
+
+    _lockRenewal: float
+
+    _eventTopic: str | None
+
+    _queueRefresh: float
+
+    _queues: List[str]
+
+    _queuesFetched: float
+
+    _senders: Dict[str, ServiceBusSender]
+
+    _lock: threading.RLock
+
+    _sent: int = 0
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        self._batchSize = int(config.get("batchsize") or 0)
+        self._maxWait = float(config.get("maxwait") or 5)
+        self._lockRenewal = float(config.get("lockrenewal") or 300)
+
+        self._eventTopic = config.get("eventtopic") or None
+        self._queueRefresh = float(config.get("queuerefresh") or 60)
+        self._queues = []
+        self._queuesFetched = float("-inf")
+        self._senders = {}
+        self._lock = threading.RLock()
+
     @property
     def isReady(self) -> bool:
         return self._conn is not None
@@ -41,6 +85,9 @@ class AzureServiceBus(BusComponent):
             print("Unexpected close: ", reason, flush=True)
             exit(1)
         if self.isOpen or self.isReady:
+            with self._lock:
+                for name in list(self._senders):
+                    self.close_sender(name)
             if (
                 self._conn
                 # and not self._conn.is_closed
@@ -52,41 +99,102 @@ class AzureServiceBus(BusComponent):
             return True
         return False
 
-    def publishMessage(self, route: str, message: InputPayload | EventPayload) -> bool:
+    def get_sender(self, name: str) -> ServiceBusSender:
+        # senders keep their link open, so one is reused per queue or topic
+        if name not in self._senders:
+            if not self._conn:
+                raise Exception("Service Bus connection is not established")
+            self._senders[name] = (
+                self._conn.get_topic_sender(topic_name=name)
+                if name == self._eventTopic
+                else self._conn.get_queue_sender(queue_name=name)
+            )
+        return self._senders[name]
+
+    def close_sender(self, name: str):
+        sender = self._senders.pop(name, None)
+        if sender is not None:
+            sender.close()
+
+    def get_event_queues(self) -> List[str]:
+        # listing every queue is slow on large namespaces, so the list is
+        # cached and refreshed every conf.bus.queuerefresh seconds
+        if time.monotonic() - self._queuesFetched > self._queueRefresh:
+            with ServiceBusAdministrationClient.from_connection_string(
+                self._url
+            ) as admin_client:
+                self._queues = [x.name for x in admin_client.list_queues()]
+            self._queuesFetched = time.monotonic()
+        return self._queues
+
+    def send_batch(self, name: str, bodies: List[bytes]):
+        # _sent counts the bodies in batches the service has accepted
+        sender = self.get_sender(name)
+        batch = sender.create_message_batch()
+        self._sent = 0
+        for body in bodies:
+            message = ServiceBusMessage(body, content_type=self.codec.contentType)
+            try:
+                batch.add_message(message)
+            except MessageSizeExceededError:
+                if len(batch) == 0:
+                    raise
+                sender.send_messages(batch)
+                self._sent += len(batch)
+                batch = sender.create_message_batch()
+                batch.add_message(message)
+        if len(batch):
+            sender.send_messages(batch)
+            self._sent += len(batch)
+
+    def publish_batch(self, name: str, bodies: List[bytes]):
+        try:
+            self.send_batch(name, bodies)
+
+        # the link may have been dropped, open a fresh sender and retry the
+        # batches that were not sent yet. the one in flight may have arrived,
+        # so delivery is at least once
+        except ServiceBusConnectionError as e:
+            print(str(e), flush=True)
+            self.close_sender(name)
+            self.send_batch(name, bodies[self._sent :])
+
+    def publishMany(
+        self, route: str, messages: List[InputPayload | EventPayload]
+    ) -> bool:
         if not self.isReady or not self._conn:
             self._connect()
         if not self._conn:
             raise Exception("Service Bus connection is not established")
 
-        isEvent = (
-            True
-            if "type" in message
-            and message["type"] in [InputType.EVENT.value, InputType.EVENT]
-            else False
-        )
-        asb_message = ServiceBusMessage(
-            simplejson.dumps(message, default=decimal_default, ignore_nan=True)
-        )
+        inputs: List[bytes] = []
+        events: List[bytes] = []
+        for message in messages:
+            isEvent = (
+                True
+                if "type" in message
+                and message["type"] in [InputType.EVENT.value, InputType.EVENT]
+                else False
+            )
+            (events if isEvent else inputs).append(self._serializer.dumps(message))
 
-        # NOTE: azure service bus does not support event routing. thus, we must
-        #       manually handle the event routing
-        if isEvent:
-            with ServiceBusAdministrationClient.from_connection_string(
-                self._url
-            ) as admin_client:
-                for queue_properties in admin_client.list_queues():
-                    sender = self._conn.get_queue_sender(
-                        queue_name=self.getRoute(queue_properties.name)
-                    )
-                    with sender:
-                        sender.send_messages(asb_message)
+        with self._lock:
+            if len(inputs):
+                self.publish_batch(self.getRoute(route), inputs)
 
-            return super().publishMessage(route, message)
+            # NOTE: azure service bus queues do not support event routing. a
+            #       topic whose subscriptions forward to each queue fans out
+            #       natively, otherwise every queue is sent the events
+            if len(events) and self._eventTopic:
+                self.publish_batch(self._eventTopic, events)
+            elif len(events):
+                for queue in self.get_event_queues():
+                    self.publish_batch(queue, events)
 
-        sender = self._conn.get_queue_sender(queue_name=self.getRoute(route))
-        with sender:
-            sender.send_messages(asb_message)
+        return True
 
+    def publishMessage(self, route: str, message: InputPayload | EventPayload) -> bool:
+        self.publishMany(route, [message])
         return super().publishMessage(route, message)
 
     def subscribe(
@@ -95,44 +203,69 @@ class AzureServiceBus(BusComponent):
         inputProcessor: InputProcessor,
         onConsuming: OnConsuming | None,
         bindEventExchange: bool,
+        concurrency: int = 1,
     ) -> bool:
         if not self.isReady or not self._conn:
             self._connect()
         if not self._conn:
             raise Exception("Service Bus connection is not established")
 
-        receiver = self._conn.get_queue_receiver(queue_name=self.getRoute(route))
-        with receiver:
-            received_msgs = receiver.receive_messages(max_message_count=1)
-            for msg in received_msgs:
-                thread = threading.Thread(
-                    target=self.on_message,
-                    args=(msg, receiver, inputProcessor),
-                )
-                thread.start()
-                thread.join()
-
-        time.sleep(1)
-        self.subscribe(
-            route,
-            inputProcessor,
-            onConsuming,
-            bindEventExchange,
+        concurrency = max(1, concurrency)
+        batchSize = self._batchSize or concurrency
+        receiver = self._conn.get_queue_receiver(
+            queue_name=self.getRoute(route),
+            prefetch_count=self._prefetch or batchSize,
         )
+        renewer = AutoLockRenewer(max_lock_renewal_duration=self._lockRenewal)
+
+        def receive(count: int, timeout: float) -> List[ServiceBusReceivedMessage]:
+            messages = receiver.receive_messages(
+                max_message_count=min(batchSize, count), max_wait_time=timeout
+            )
+            for msg in messages:
+                renewer.register(receiver, msg)
+            return messages
+
+        with receiver, renewer:
+            if onConsuming:
+                onConsuming(self.getRoute(route))
+            receiveLoop(
+                receive,
+                partial(self.on_message, inputProcessor=inputProcessor),
+                partial(self.settle_message, receiver),
+                lambda: self._conn is not None,
+                concurrency,
+                self._maxWait,
+            )
 
         return True
 
     def on_message(
         self,
-        body: Any,
-        receiver: ServiceBusReceiver,
+        body: ServiceBusReceivedMessage,
         inputProcessor: InputProcessor,
+    ) -> StatusCode:
+        payload = self._serializer.loads(b"".join(body.body))
+        return resolveResult(inputProcessor(payload))
+
+    def settle_message(
+        self,
+        receiver: ServiceBusReceiver,
+        body: ServiceBusReceivedMessage,
+        result: Callable[[], StatusCode],
     ):
-        payload = json.loads(str(body))
-        result = inputProcessor(payload)
+        # the receiver closes with the connection, and the messages still in
+        # flight are redelivered once their locks expire
+        if self._conn is None:
+            return
+        try:
+            status = result()
+        except Exception as e:
+            print("Error processing message", e, flush=True)
+            receiver.abandon_message(body)
+            return
 
-        if result == StatusCode.NO_PROCESSING:
+        if status == StatusCode.NO_PROCESSING:
             receiver.abandon_message(body)
         else:
             receiver.complete_message(body)
-        print("Processed message", flush=True)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from functools import partial
+from typing import Callable, Deque, Dict, List, Set
+
+from servc.svc.com.bus import BusComponent, InputProcessor, OnConsuming
+from servc.svc.com.bus.receive import receiveLoop, resolveResult
+from servc.svc.config import Config
+from servc.svc.io.input import EventPayload, InputPayload, InputType
+from servc.svc.io.output import StatusCode
+
+# longest wait, in seconds, for new messages on an idle queue before the
+# consumer checks whether the bus was closed
+POLL_INTERVAL = 0.5
+
+
+class MemoryBroker:
+    """
+    Queues and event exchange bindings shared by every BusMemory connected to
+    the same url, mirroring a RabbitMQ broker within one process.
+    """
+
+    _queues: Dict[str, Deque[bytes]]
+
+    _bound: Set[str]
+
+    _unacked: Dict[str, int]
+
+    _condition: threading.Condition
+
+    def __init__(self):
+        self._queues = {}
+        self._bound = set()
+        self._unacked = {}
+        self._condition = threading.Condition()
+
+    def declare(self, queue: str, bindEventExchange: bool):
+        with self._condition:
+            if queue not in self._queues:
+                self._queues[queue] = deque()
+                self._unacked[queue] = 0
+            if bindEventExchange:
+                self._bound.add(queue)
+
+    def delete(self, queue: str):
+        with self._condition:
+            self._queues.pop(queue, None)
+            self._unacked.pop(queue, None)
+            self._bound.discard(queue)
+            self._condition.notify_all()
+
+    def length(self, queue: str) -> int:
+        with self._condition:
+            return len(self._queues.get(queue, ()))
+
+    def publish(self, queue: str, bodies: List[bytes], event: bool = False):
+        # like the default exchange, messages to undeclared queues are dropped.
+        # events go to every queue bound to the event exchange instead
+        with self._condition:
+            for name in self._bound if event else [queue]:
+                if name in self._queues:
+                    self._queues[name].extend(bodies)
+            self._condition.notify_all()
+
+    def get(self, queue: str, timeout: float) -> bytes | None:
+        with self._condition:
+            messages = self._queues.get(queue)
+            if not messages:
+                self._condition.wait(timeout)
+                messages = self._queues.get(queue)
+            if not messages:
+                return None
+            self._unacked[queue] += 1
+            return messages.popleft()
+
+    def settle(self, queue: str, body: bytes, requeue: bool):
+        with self._condition:
+            if queue not in self._queues:
+                return
+            self._unacked[queue] -= 1
+            if requeue:
+                self._queues[queue].appendleft(body)
+                self._condition.notify_all()
+
+    def wake(self):
+        with self._condition:
+            self._condition.notify_all()
+
+
+BROKERS: Dict[str, MemoryBroker] = {}
+
+_brokersLock = threading.Lock()
+
+
+def get_broker(url: str) -> MemoryBroker:
+    with _brokersLock:
+        if url not in BROKERS:
+            BROKERS[url] = MemoryBroker()
+        return BROKERS[url]
+
+
+def is_event(message: InputPayload | EventPayload) -> bool:
+    return "type" in message and message["type"] in [
+        InputType.EVENT.value,
+        InputType.EVENT,
+    ]
+
+
+class BusMemory(BusComponent):
+    """
+    In process bus with the semantics of BusRabbitMQ, for tests and
+    benchmarks. Messages are serialized as they would be on the wire.
+    """
+
+    _broker: MemoryBroker
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        self._broker = get_broker(self._url)
+
+    @property
+    def broker(self) -> MemoryBroker:
+        return self._broker
+
+    def _connect(self):
+        self._isReady = True
+        self._isOpen = True
+
+    def _close(self):
+        if self._isOpen:
+            self._isReady = False
+            self._isOpen = False
+            self._broker.wake()
+            return True
+        return False
+
+    def create_queue(self, queue: str, bindEventExchange: bool) -> bool:
+        self._broker.declare(self.getRoute(queue), bindEventExchange)
+        return True
+
+    def delete_queue(self, queue: str) -> bool:
+        self._broker.delete(self.getRoute(queue))
+        return True
+
+    def get_queue_length(self, queue: str) -> int:
+        return self._broker.length(self.getRoute(queue))
+
+    def publishMany(
+        self, route: str, messages: List[InputPayload | EventPayload]
+    ) -> bool:
+        if not self.isReady:
+            self._connect()
+        for message in messages:
+            self._broker.publish(
+                self.getRoute(route),
+                [self._serializer.dumps(message)],
+                is_event(message),
+            )
+        return True
+
+    def publishMessage(self, route: str, message: InputPayload | EventPayload) -> bool:
+        self.publishMany(route, [message])
+        return super().publishMessage(route, message)
+
+    def subscribe(
+        self,
+        route: str,
+        inputProcessor: InputProcessor,
+        onConsuming: OnConsuming | None,
+        bindEventExchange: bool,
+        concurrency: int = 1,
+    ) -> bool:
+        if not self.isReady:
+            self._connect()
+        queue = self.getRoute(route)
+        self._broker.declare(queue, bindEventExchange)
+        if onConsuming:
+            onConsuming(queue)
+
+        def receive(_count: int, timeout: float) -> List[bytes]:
+            body = self._broker.get(queue, timeout)
+            return [] if body is None else [body]
+
+        receiveLoop(
+            receive,
+            partial(self.on_message, inputProcessor=inputProcessor),
+            partial(self.settle_message, queue),
+            lambda: self._isOpen,
+            concurrency,
+            POLL_INTERVAL,
+            self._broker.wake,
+        )
+        return True
+
+    def on_message(self, body: bytes, inputProcessor: InputProcessor) -> StatusCode:
+        payload = self._serializer.loads(body)
+        return resolveResult(inputProcessor(payload))
+
+    def settle_message(self, queue: str, body: bytes, result: Callable[[], StatusCode]):
+        # a failing resolver requeues its message and stops the consumer, as
+        # the RabbitMQ bus exits on an unexpected error
+        try:
+            status = result()
+        except Exception:
+            self._broker.settle(queue, body, True)
+            self.close()
+            raise
+        self._broker.settle(queue, body, status == StatusCode.NO_PROCESSING)
@@ -1,19 +1,26 @@
 from __future__ import annotations
 
-import json
-from typing import Any, Callable, Tuple
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Tuple
 
 import pika  # type: ignore
 import pika.channel  # type: ignore
 import pika.exceptions  # type: ignore
-import simplejson
 from pika.adapters.asyncio_connection import AsyncioConnection  # type: ignore
-from pika.adapters.blocking_connection import BlockingConnection  # type: ignore
+from pika.adapters.blocking_connection import (  # type: ignore
+    BlockingChannel,
+    BlockingConnection,
+)
 
 from servc.svc.com.bus import BusComponent, InputProcessor, OnConsuming
-from servc.svc.com.cache.redis import decimal_default
+from servc.svc.config import Config
 from servc.svc.io.input import EventPayload, InputPayload, InputType
 from servc.svc.io.output import StatusCode
+from servc.svc.metrics import BUS_SECONDS, PUBLISHED
 
 EVENT_EXCHANGE = "amq.fanout"
 
@@ -28,6 +35,15 @@ def queue_declare(
         channel.queue_bind(exchange=EVENT_EXCHANGE, queue=queueName)
 
 
+def exchange_for(message: InputPayload | EventPayload) -> str:
+    return (
+        EVENT_EXCHANGE
+        if "type" in message
+        and message["type"] in [InputType.EVENT.value, InputType.EVENT]
+        else ""
+    )
+
+
 def on_channel_open(channel: pika.channel.Channel, method: Callable, args: Tuple):
     return method(*args, channel)
 
@@ -37,6 +53,22 @@ class BusRabbitMQ(BusComponent):
 
     _conn: AsyncioConnection | BlockingConnection | None = None
 
+    _lock: threading.RLock
+
+    _publishChannel: BlockingChannel | None = None
+
+    _transactional: bool
+
+    _published: int = 0
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        self._transactional = bool(config.get("transactional"))
+
+        # a blocking connection may be shared by threads, such as the
+        # ones behind publishMessageAsync, so its use is serialized
+        self._lock = threading.RLock()
+
     @property
     def isReady(self) -> bool:
         return (
@@ -57,8 +89,11 @@ class BusRabbitMQ(BusComponent):
     ):
         if not self.isOpen:
             if blocking:
-                self._conn = BlockingConnection(pika.URLParameters(self._url))
-                return self.get_channel(method, args)
+                with self._lock:
+                    if not self.isOpen:
+                        self._conn = BlockingConnection(pika.URLParameters(self._url))
+                        self._publishChannel = None
+                    return self.get_channel(method, args)
             else:
                 self._conn = AsyncioConnection(
                     parameters=pika.URLParameters(self._url),
@@ -80,6 +115,7 @@ class BusRabbitMQ(BusComponent):
             ):
                 self._conn.close()
                 self._conn = None
+                self._publishChannel = None
 
             return True
         return False
@@ -91,23 +127,28 @@ class BusRabbitMQ(BusComponent):
             self._conn = None
             exit(1)
 
-    def get_channel(self, method: Callable | None, args: Tuple | None):
+    def get_channel(
+        self, method: Callable | None, args: Tuple | None, retry: bool = True
+    ):
         if not self.isReady:
             self._connect(method, args)
         elif method and args and self._conn:
             if self.isBlockingConnection():
-
-                try:
-                    channel = self._conn.channel()
-                    return on_channel_open(channel, method, args)
-
-                # if the connection is lost, we will retry
-                # this often happens for connections that are
-                # left idle for a long time
-                except pika.exceptions.StreamLostError as e:
-                    print(str(e), flush=True)
-                    self._conn = None
-                    return self.get_channel(method, args)
+                with self._lock:
+                    try:
+                        channel = self._conn.channel()
+                        return on_channel_open(channel, method, args)
+
+                    # if the connection is lost, we will reconnect and retry
+                    # once. this often happens for connections that are
+                    # left idle for a long time or when the broker restarts
+                    except pika.exceptions.AMQPConnectionError as e:
+                        if not retry:
+                            raise
+                        print(str(e), flush=True)
+                        self._conn = None
+                        self._connect()
+                        return self.get_channel(method, args, retry=False)
 
             else:
                 self._conn.channel(
@@ -140,6 +181,7 @@ class BusRabbitMQ(BusComponent):
         if not channel:
             return self.get_channel(self.get_queue_length, (route,))
 
+        started = time.perf_counter()
         try:
             queue = channel.queue_declare(
                 queue=self.getRoute(route),
@@ -152,6 +194,75 @@ class BusRabbitMQ(BusComponent):
             return queue.method.message_count
         except pika.exceptions.ChannelClosedByBroker:
             return 0
+        finally:
+            BUS_SECONDS.labels(self.getRoute(route), "get_queue_length").observe(
+                time.perf_counter() - started
+            )
+
+    @property
+    def properties(self) -> pika.BasicProperties:
+        return pika.BasicProperties(content_type=self.codec.contentType)
+
+    def publish_channel(self) -> BlockingChannel:
+        # publishing reuses one channel instead of opening and closing a
+        # channel per message. with conf.bus.transactional the channel uses
+        # AMQP transactions, so a whole batch is acknowledged by the broker in
+        # a single round trip; pika's confirm mode would wait on every message
+        if self._publishChannel is None or not self._publishChannel.is_open:
+            if not self._conn:
+                raise Exception("RabbitMQ connection is not established")
+            self._publishChannel = self._conn.channel()
+            if self._transactional:
+                self._publishChannel.tx_select()
+        return self._publishChannel
+
+    def publish_batch(
+        self, route: str, messages: List[InputPayload | EventPayload]
+    ) -> None:
+        started = time.perf_counter()
+        channel = self.publish_channel()
+        self._published = 0
+        for message in messages:
+            channel.basic_publish(
+                exchange=exchange_for(message),
+                routing_key=self.getRoute(route),
+                properties=self.properties,
+                body=self._serializer.dumps(message),
+            )
+            self._published += 1
+        if self._transactional:
+            channel.tx_commit()
+        BUS_SECONDS.labels(self.getRoute(route), "publish").observe(
+            time.perf_counter() - started
+        )
+        PUBLISHED.labels(self.getRoute(route)).inc(len(messages))
+
+    def publishMany(
+        self, route: str, messages: List[InputPayload | EventPayload]
+    ) -> bool:
+        if not self.isReady:
+            self._connect()
+        if not self.isBlockingConnection():
+            return super().publishMany(route, messages)
+
+        with self._lock:
+            try:
+                self.publish_batch(route, messages)
+
+            # same as get_channel, reconnect and retry once. the broker rolls
+            # back an uncommitted transaction, so a transactional batch is sent
+            # again whole; otherwise only the messages not yet handed over are.
+            # either way delivery is at least once: the message or commit in
+            # flight when the connection dropped may have reached the broker
+            except pika.exceptions.AMQPConnectionError as e:
+                print(str(e), flush=True)
+                if not self._transactional:
+                    messages = messages[self._published :]
+                self._conn = None
+                self._connect()
+                self.publish_batch(route, messages)
+
+        return True
 
     def publishMessage(  # type: ignore
         self,
@@ -159,25 +270,26 @@ class BusRabbitMQ(BusComponent):
         message: InputPayload | EventPayload,
         channel: pika.channel.Channel | None = None,
     ) -> bool:
-        if not self.isReady:
-            return self._connect(self.publishMessage, (route, message))
         if not channel:
+            if not self.isReady:
+                self._connect()
+            if self.isBlockingConnection():
+                self.publishMany(route, [message])
+                return super().publishMessage(route, message)
             return self.get_channel(self.publishMessage, (route, message))
 
-        exchangeName = (
-            EVENT_EXCHANGE
-            if "type" in message
-            and message["type"] in [InputType.EVENT.value, InputType.EVENT]
-            else ""
-        )
-
+        started = time.perf_counter()
         channel.basic_publish(
-            exchange=exchangeName,
+            exchange=exchange_for(message),
             routing_key=self.getRoute(route),
-            properties=None,
-            body=simplejson.dumps(message, default=decimal_default, ignore_nan=True),
+            properties=self.properties,
+            body=self._serializer.dumps(message),
         )
         channel.close()
+        BUS_SECONDS.labels(self.getRoute(route), "publish").observe(
+            time.perf_counter() - started
+        )
+        PUBLISHED.labels(self.getRoute(route)).inc()
 
         return super().publishMessage(route, message)
 
@@ -187,31 +299,32 @@ class BusRabbitMQ(BusComponent):
         inputProcessor: InputProcessor,
         onConsuming: OnConsuming | None,
         bindEventExchange: bool,
+        concurrency: int = 1,
         channel: pika.channel.Channel | None = None,
     ) -> bool:
+        args = (route, inputProcessor, onConsuming, bindEventExchange, concurrency)
         if not self.isReady:
-            self._connect(
-                self.subscribe,
-                (route, inputProcessor, onConsuming, bindEventExchange),
-                blocking=False,
-            )
+            self._connect(self.subscribe, args, blocking=False)
         elif self.isBlockingConnection():
             self.close()
-            return self.subscribe(route, inputProcessor, onConsuming, bindEventExchange)
+            return self.subscribe(*args)
         if not channel:
-            return self.get_channel(
-                self.subscribe, (route, inputProcessor, onConsuming, bindEventExchange)
-            )
+            return self.get_channel(self.subscribe, args)
         channel.add_on_close_callback(lambda _c, r: self._close(False, r))
         channel.add_on_cancel_callback(lambda _c: self._close(False))
 
         queue_declare(channel, self.getRoute(route), bindEventExchange)
-        channel.basic_qos(prefetch_count=1)
+        channel.basic_qos(prefetch_count=self._prefetch or concurrency)
 
+        # with a concurrency above one, deliveries are handed to a thread
+        # pool so the ioloop stays free to receive and settle messages
+        executor = (
+            ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+        )
         channel.basic_consume(
             self.getRoute(route),
             on_message_callback=lambda c, m, p, b: self.on_message(
-                c, m, p, b, inputProcessor
+                c, m, p, b, inputProcessor, executor
             ),
             auto_ack=False,
         )
@@ -226,13 +339,72 @@ class BusRabbitMQ(BusComponent):
         properties: Any,
         body: Any,
         inputProcessor: InputProcessor,
+        executor: Executor | None = None,
     ):
         if not body:
             channel.basic_ack(method.delivery_tag)
-        payload = json.loads(body.decode("utf-8"))
+            return
+        if executor:
+            executor.submit(
+                self.process_message,
+                channel,
+                method.delivery_tag,
+                body,
+                inputProcessor,
+            )
+            return
+
+        payload = self._serializer.loads(body)
         result = inputProcessor(payload)
+        self.settle_message(channel, method.delivery_tag, result)
+
+    def process_message(
+        self,
+        channel: pika.channel.Channel,
+        deliveryTag: int,
+        body: Any,
+        inputProcessor: InputProcessor,
+    ):
+        # runs on a pool thread. pika channels are not thread safe, so
+        # settling the message (or exiting) is scheduled back on the ioloop.
+        # exit() raises SystemExit, which on this thread would only end the
+        # task, so a worker exiting on an error code is carried over as well
+        ioloop = channel.connection.ioloop
+        try:
+            payload = self._serializer.loads(body)
+            result = inputProcessor(payload)
+        except (Exception, SystemExit) as e:
+            ioloop.call_soon_threadsafe(self._close, False, e)
+            return
+        ioloop.call_soon_threadsafe(self.settle_message, channel, deliveryTag, result)
+
+    def settle_message(
+        self,
+        channel: pika.channel.Channel,
+        deliveryTag: int,
+        result: StatusCode | Awaitable[StatusCode],
+    ):
+        # asynchronous resolvers hand back a coroutine that is scheduled on
+        # the connection's loop. the message is settled once it finishes, so
+        # prefetch bounds how many of them are in flight
+        if inspect.isawaitable(result):
+            task = asyncio.ensure_future(result, loop=channel.connection.ioloop)
+            task.add_done_callback(lambda t: self.settle_task(channel, deliveryTag, t))
+            return
 
         if result == StatusCode.NO_PROCESSING:
-            channel.basic_nack(method.delivery_tag)
+            channel.basic_nack(deliveryTag)
         else:
-            channel.basic_ack(method.delivery_tag)
+            channel.basic_ack(deliveryTag)
+
+    def settle_task(
+        self,
+        channel: pika.channel.Channel,
+        deliveryTag: int,
+        task: asyncio.Future,
+    ):
+        if task.cancelled():
+            return self._close(False, "resolver task cancelled")
+        if task.exception():
+            return self._close(False, task.exception())
+        self.settle_message(channel, deliveryTag, task.result())
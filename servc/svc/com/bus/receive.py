@@ -0,0 +1,92 @@
+"""
+Consumer loop shared by the buses that pull messages from their broker, as
+opposed to RabbitMQ's, which pushes them onto its own event loop.
+"""
+
+import asyncio
+import inspect
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Iterable, TypeVar
+
+from servc.svc.io.output import StatusCode
+
+# longest wait, in seconds, for new messages while others are in flight, so
+# finished ones are settled promptly. buses that can be woken when a message
+# finishes settle it straight away
+SETTLE_INTERVAL = 0.1
+
+M = TypeVar("M")
+
+_local = threading.local()
+
+
+def resolveResult(result: StatusCode | Awaitable[StatusCode]) -> StatusCode:
+    """
+    Runs an asynchronous resolver to completion. Each thread keeps one event
+    loop for its life, so resolvers on it share their loop, and whatever is
+    bound to it, from one message to the next.
+    """
+    if not inspect.isawaitable(result):
+        return result
+    loop = getattr(_local, "loop", None)
+    if loop is None:
+        loop = _local.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(result)
+
+
+def receiveLoop(
+    receive: Callable[[int, float], Iterable[M]],
+    process: Callable[[M], StatusCode],
+    settle: Callable[[M, Callable[[], StatusCode]], Any],
+    isOpen: Callable[[], bool],
+    concurrency: int,
+    idleWait: float,
+    wake: Callable[[], Any] | None = None,
+):
+    """
+    Receives and processes messages until isOpen turns false, then settles
+    the ones still in flight. receive(count, timeout) returns up to count
+    messages, waiting at most timeout seconds for the first one.
+
+    With a concurrency above one, messages are processed on a pool while
+    this thread keeps receiving. Clients are rarely thread safe, so messages
+    are only received and settled on this thread. settle is handed a
+    callable returning the status, or raising the resolver's error.
+    """
+    concurrency = max(1, concurrency)
+    if concurrency == 1:
+        while isOpen():
+            for message in receive(1, idleWait):
+                settle(message, partial(process, message))
+        return
+
+    inflight: Dict[Future, M] = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while isOpen() or inflight:
+            capacity = concurrency - len(inflight)
+            if isOpen() and capacity > 0:
+                timeout = idleWait
+                if inflight:
+                    finished = any(future.done() for future in inflight)
+                    timeout = 0 if finished else SETTLE_INTERVAL
+                received = False
+                for message in receive(capacity, timeout):
+                    future = executor.submit(process, message)
+                    if wake:
+                        future.add_done_callback(lambda _f: wake())
+                    inflight[future] = message
+                    received = True
+                if received:
+                    continue
+            if not inflight:
+                continue
+
+            done, _ = wait(
+                inflight,
+                timeout=None if not isOpen() or len(inflight) >= concurrency else 0,
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                settle(inflight.pop(future), future.result)
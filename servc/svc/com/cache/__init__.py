@@ -1,30 +1,218 @@
-from typing import Any
+import asyncio
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Any, Dict, Iterator, List
 
 from servc.svc import ComponentType, Middleware
+from servc.svc.codec import TAG_MARKER, Codec, Serializer, get_serializer
+from servc.svc.com.storage.blob import BlobStorage
 from servc.svc.config import Config
 from servc.svc.io.output import StatusCode
 from servc.svc.io.response import generateResponseArtifact
 
+# values offloaded to blob storage are replaced in the cache by this marker
+# followed by the blob's prefix
+OFFLOAD_MARKER = b"".join([TAG_MARKER, b"@"])
+
+
+class KeyWatch:
+    """
+    Notifications of one id, from CacheComponent.watchKey. Caches without
+    notifications simply wait out the timeout.
+    """
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Blocks until the id is notified or timeout seconds pass, returning
+        whether a notification arrived. Notifications sent since the watch
+        began, or since the last wait returned, are not missed.
+        """
+        time.sleep(timeout)
+        return False
+
 
 class CacheComponent(Middleware):
     name: str = "cache"
 
     _type: ComponentType = ComponentType.CACHE
 
+    _argumentTTL: int | None
+
+    _progressTTL: int | None
+
+    _resultTTL: int | None
+
+    _serializer: Serializer
+
+    _offloadStorage: BlobStorage | None
+
+    _offloadThreshold: int
+
+    _offloadContainer: str
+
     def __init__(self, config: Config):
         super().__init__(config)
 
-    def setKey(self, id: str, value: Any) -> str:
+        self._serializer = get_serializer(config)
+
+        # serialized values at or above the threshold, in bytes, are written
+        # to the offload storage once one is set. 0 keeps every value cached.
+        # blobs go when their key is deleted or overwritten, but not when it
+        # expires, so expiring keys need a matching lifecycle on the container
+        self._offloadStorage = None
+        self._offloadThreshold = int(config.get("offloadthreshold") or 0)
+        self._offloadContainer = str(config.get("offloadcontainer") or "servc-offload")
+
+        # expiries in seconds per kind of key, unset or 0 keeps keys forever
+        self._argumentTTL = int(config.get("argumentttl") or 0) or None
+        self._progressTTL = int(config.get("progressttl") or 0) or None
+        self._resultTTL = int(config.get("resultttl") or 0) or None
+
+    @property
+    def codec(self) -> Codec:
+        return self._serializer.codec
+
+    @property
+    def serializer(self) -> Serializer:
+        return self._serializer
+
+    @property
+    def offloadStorage(self) -> BlobStorage | None:
+        return self._offloadStorage
+
+    def setOffloadStorage(self, storage: BlobStorage | None):
+        self._offloadStorage = storage
+
+    def _offload(self, id: str, data: bytes) -> bytes:
+        if (
+            self._offloadStorage is None
+            or not self._offloadThreshold
+            or len(data) < self._offloadThreshold
+        ):
+            return data
+        self._offloadStorage.put_file(self._offloadContainer, id, data)
+        return b"".join([OFFLOAD_MARKER, id.encode("utf-8")])
+
+    def _resolveOffload(self, data: bytes) -> bytes | None:
+        if data[:2] != OFFLOAD_MARKER:
+            return data
+        if self._offloadStorage is None:
+            raise Exception("Cache value is offloaded but no offload storage is set")
+        blob = self._offloadStorage.get_file(
+            self._offloadContainer, data[2:].decode("utf-8")
+        )
+        if isinstance(blob, BytesIO):
+            return blob.getvalue()
+        return blob or None
+
+    def _discardOffload(self, data: bytes | None):
+        if data and data[:2] == OFFLOAD_MARKER and self._offloadStorage is not None:
+            self._offloadStorage.delete_file(
+                self._offloadContainer, data[2:].decode("utf-8")
+            )
+
+    def _discardReplaced(self, previous: bytes | None, data: bytes):
+        # an offloaded value overwrites the previous blob in place, a cached
+        # one would leave it behind
+        if data[:2] != OFFLOAD_MARKER:
+            self._discardOffload(previous)
+
+    @property
+    def argumentTTL(self) -> int | None:
+        return self._argumentTTL
+
+    @property
+    def progressTTL(self) -> int | None:
+        return self._progressTTL
+
+    @property
+    def resultTTL(self) -> int | None:
+        return self._resultTTL
+
+    def setKey(self, id: str, value: Any, expiry: int | None = None) -> str:
         return ""
 
     def getKey(self, id: str) -> Any | None:
         return None
 
+    def getImmutableKey(self, id: str) -> Any | None:
+        """
+        Reads a key whose value never changes once written, such as a content
+        addressed argument artifact, which caches may serve from memory.
+        """
+        return self.getKey(id)
+
     def deleteKey(self, id: str) -> bool:
         return False
 
+    def setKeys(self, values: Dict[str, Any], expiry: int | None = None) -> List[str]:
+        return [self.setKey(id, value, expiry) for id, value in values.items()]
+
+    def getKeys(self, ids: List[str]) -> List[Any | None]:
+        return [self.getKey(id) for id in ids]
+
+    def deleteKeys(self, ids: List[str]) -> int:
+        return len([id for id in ids if self.deleteKey(id)])
+
+    def submit(
+        self,
+        id: str,
+        arguments: Dict[str, Any],
+        progress: Any,
+        force: bool = False,
+    ) -> Any | None:
+        """
+        Stores a job's arguments and its initial progress under id, unless a
+        response already exists there. Returns that existing response, in
+        which case nothing is written. Forcing replaces any existing response.
+        """
+        if force:
+            self.deleteKey(id)
+        else:
+            existing = self.getKey(id)
+            if existing is not None:
+                return existing
+        if len(arguments):
+            self.setKeys(arguments, self.argumentTTL)
+        self.setKey(id, progress, self.progressTTL)
+        return None
+
+    def addToSet(self, id: str, value: str, expiry: int | None = None) -> int:
+        """
+        Adds value to the set stored at id. Returns the size of the set after
+        the addition, or 0 when value was already a member. The addition and
+        the count are atomic, so concurrent callers each see a distinct size.
+        """
+        return 0
+
+    def notifyKey(self, id: str) -> bool:
+        return False
+
+    @contextmanager
+    def watchKey(self, id: str) -> Iterator[KeyWatch]:
+        """
+        Watches id for notifications sent through notifyKey. Reading the key
+        once the watch has begun leaves no gap for a notification to be lost.
+        """
+        yield KeyWatch()
+
+    def waitKey(self, id: str, timeout: float) -> bool:
+        """
+        Blocks until id is notified through notifyKey or timeout seconds
+        pass, returning whether a notification arrived.
+        """
+        with self.watchKey(id) as watch:
+            return watch.wait(timeout)
+
+    async def setKeyAsync(self, id: str, value: Any, expiry: int | None = None) -> str:
+        return await asyncio.to_thread(self.setKey, id, value, expiry)
+
+    async def getKeyAsync(self, id: str) -> Any | None:
+        return await asyncio.to_thread(self.getKey, id)
+
     def setProgress(self, id: str, progress: float, message: str) -> bool:
-        return not not self.setKey(
+        written = not not self.setKey(
             id,
             generateResponseArtifact(
                 id,
@@ -33,4 +221,7 @@ class CacheComponent(Middleware):
                 StatusCode.OK,
                 False,
             ),
+            self.progressTTL,
         )
+        self.notifyKey(id)
+        return written
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+
+class LRUCache:
+    """
+    Thread safe least recently used store of raw values, bounded by the total
+    number of bytes held and, optionally, by how long an entry may live.
+    """
+
+    _maxsize: int
+
+    _ttl: float | None
+
+    _size: int
+
+    _entries: OrderedDict[str, Tuple[bytes, float | None]]
+
+    _lock: threading.Lock
+
+    hits: int
+
+    misses: int
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            expires = entry[1] if entry is not None else None
+            if expires is not None and expires < time.monotonic():
+                self._evict(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: bytes):
+        # values larger than the whole cache are not worth evicting for
+        if len(value) > self._maxsize:
+            return
+        with self._lock:
+            self._evict(key)
+            expires = time.monotonic() + self._ttl if self._ttl else None
+            self._entries[key] = (value, expires)
+            self._size += len(value)
+            while self._size > self._maxsize:
+                self._evict(next(iter(self._entries)))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._evict(key)
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
@@ -0,0 +1,224 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from servc.svc.com.cache import CacheComponent, KeyWatch
+from servc.svc.config import Config
+
+
+class MemoryStore:
+    """
+    Keys, sets and notifications shared by every CacheMemory connected to the
+    same url, mirroring a Redis server within one process. Expired keys are
+    dropped when they are next read.
+    """
+
+    values: Dict[str, Tuple[bytes | Set[str], float | None]]
+
+    generations: Dict[str, int]
+
+    waiters: Dict[str, int]
+
+    condition: threading.Condition
+
+    def __init__(self):
+        self.values = {}
+        self.generations = {}
+        self.waiters = {}
+        self.condition = threading.Condition()
+
+    def get(self, id: str) -> bytes | Set[str] | None:
+        # callers hold the condition
+        entry = self.values.get(id)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self.values[id]
+            return None
+        return entry[0]
+
+    def set(self, id: str, value: bytes | Set[str], expiry: int | None):
+        self.values[id] = (value, time.monotonic() + expiry if expiry else None)
+
+
+class MemoryKeyWatch(KeyWatch):
+    _store: MemoryStore
+
+    _id: str
+
+    _generation: int
+
+    def __init__(self, store: MemoryStore, id: str, generation: int):
+        self._store = store
+        self._id = id
+        self._generation = generation
+
+    def wait(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        store = self._store
+        with store.condition:
+            while store.generations[self._id] == self._generation:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                store.condition.wait(remaining)
+            self._generation = store.generations[self._id]
+            return True
+
+
+STORES: Dict[str, MemoryStore] = {}
+
+_storesLock = threading.Lock()
+
+
+def get_store(url: str) -> MemoryStore:
+    with _storesLock:
+        if url not in STORES:
+            STORES[url] = MemoryStore()
+        return STORES[url]
+
+
+class CacheMemory(CacheComponent):
+    """
+    In process cache with the semantics of CacheRedis, for tests and
+    benchmarks. Values are serialized as they would be on the wire.
+    """
+
+    _url: str
+
+    _store: MemoryStore
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        self._url = str(config.get("url"))
+        self._store = get_store(self._url)
+
+    @property
+    def store(self) -> MemoryStore:
+        return self._store
+
+    def _connect(self):
+        self._isReady = True
+        self._isOpen = True
+
+    def _close(self):
+        if self._isOpen:
+            self._isReady = False
+            self._isOpen = False
+            return True
+        return False
+
+    def _load(self, value: bytes | Set[str] | None) -> Any | None:
+        if not isinstance(value, bytes):
+            return None
+        resolved = self._resolveOffload(value)
+        return self._serializer.loads(resolved) if resolved else None
+
+    def setKey(self, id: str, value: Any, expiry: int | None = None) -> str:
+        data = self._offload(id, self._serializer.dumps(value))
+        with self._store.condition:
+            previous = self._store.get(id)
+            self._store.set(id, data, expiry)
+        if isinstance(previous, bytes):
+            self._discardReplaced(previous, data)
+        return id
+
+    def getKey(self, id: str) -> Any | None:
+        with self._store.condition:
+            value = self._store.get(id)
+        return self._load(value)
+
+    def deleteKey(self, id: str) -> bool:
+        return self.deleteKeys([id]) > 0
+
+    def setKeys(self, values: Dict[str, Any], expiry: int | None = None) -> List[str]:
+        data = {
+            id: self._offload(id, self._serializer.dumps(value))
+            for id, value in values.items()
+        }
+        with self._store.condition:
+            previous = [self._store.get(id) for id in data]
+            for id, value in data.items():
+                self._store.set(id, value, expiry)
+        for old, value in zip(previous, data.values()):
+            if isinstance(old, bytes):
+                self._discardReplaced(old, value)
+        return list(values.keys())
+
+    def getKeys(self, ids: List[str]) -> List[Any | None]:
+        with self._store.condition:
+            values = [self._store.get(id) for id in ids]
+        return [self._load(value) for value in values]
+
+    def deleteKeys(self, ids: List[str]) -> int:
+        with self._store.condition:
+            values = [self._store.get(id) for id in ids]
+            for id in ids:
+                self._store.values.pop(id, None)
+        for value in values:
+            if isinstance(value, bytes):
+                self._discardOffload(value)
+        return len([value for value in values if value is not None])
+
+    def submit(
+        self,
+        id: str,
+        arguments: Dict[str, Any],
+        progress: Any,
+        force: bool = False,
+    ) -> Any | None:
+        data = {
+            argumentId: self._offload(argumentId, self._serializer.dumps(argument))
+            for argumentId, argument in arguments.items()
+        }
+        progressData = self._offload(id, self._serializer.dumps(progress))
+
+        # the dedup check and every write happen atomically
+        with self._store.condition:
+            existing = self._store.get(id)
+            if existing is not None and not force:
+                return self._load(existing)
+            for argumentId, argument in data.items():
+                self._store.set(argumentId, argument, self.argumentTTL)
+            self._store.set(id, progressData, self.progressTTL)
+        if isinstance(existing, bytes):
+            self._discardOffload(existing)
+        return None
+
+    def addToSet(self, id: str, value: str, expiry: int | None = None) -> int:
+        with self._store.condition:
+            members = self._store.get(id)
+            if not isinstance(members, set):
+                members = set()
+                self._store.set(id, members, expiry)
+            elif expiry:
+                self._store.set(id, members, expiry)
+            added = value not in members
+            members.add(value)
+            return len(members) if added else 0
+
+    def notifyKey(self, id: str) -> bool:
+        with self._store.condition:
+            if not self._store.waiters.get(id):
+                return False
+            self._store.generations[id] += 1
+            self._store.condition.notify_all()
+            return True
+
+    @contextmanager
+    def watchKey(self, id: str) -> Iterator[KeyWatch]:
+        store = self._store
+        with store.condition:
+            # watchers of an id share a generation counter, so every one of
+            # them sees a notification. it is dropped along with the last one
+            generation = store.generations.setdefault(id, 0)
+            store.waiters[id] = store.waiters.get(id, 0) + 1
+        try:
+            yield MemoryKeyWatch(store, id, generation)
+        finally:
+            with store.condition:
+                store.waiters[id] -= 1
+                if not store.waiters[id]:
+                    del store.waiters[id]
+                    del store.generations[id]
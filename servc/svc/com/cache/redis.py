@@ -1,21 +1,66 @@
-import datetime
-import decimal
-import json
-from typing import Any
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
 
-import simplejson
-from redis import Redis
+from redis import Redis, RedisError
+from redis.client import PubSub
+from redis.commands.core import Script
 
-from servc.svc.com.cache import CacheComponent
+from servc.svc.codec import decimal_default as decimal_default
+from servc.svc.com.cache import CacheComponent, KeyWatch
+from servc.svc.com.cache.lru import LRUCache
 from servc.svc.config import Config
+from servc.svc.metrics import CACHE_SECONDS, timed
 
+NOTIFY_PREFIX = "servc-notify:"
 
-def decimal_default(obj: Any) -> None | str | float:
-    if isinstance(obj, decimal.Decimal):
-        return float(obj)
-    if isinstance(obj, (datetime.date, datetime.datetime)):
-        return obj.isoformat()
-    return None
+# longest wait, in seconds, for redis to confirm a subscription
+SUBSCRIBE_TIMEOUT = 1
+
+# KEYS: the response id, then every argument id
+# ARGV: mode ("new" or "force"), progress payload, progress ttl, argument ttl,
+#       then one payload per argument id. ttls of 0 never expire
+#
+# in "new" mode an existing response is returned untouched. otherwise the
+# arguments and progress are written and the replaced response is returned
+SUBMIT_SCRIPT = """
+local existing = redis.call("GET", KEYS[1])
+if existing and ARGV[1] == "new" then
+    return existing
+end
+local function write(key, value, ttl)
+    if tonumber(ttl) > 0 then
+        redis.call("SET", key, value, "EX", ttl)
+    else
+        redis.call("SET", key, value)
+    end
+end
+for i = 2, #KEYS do
+    write(KEYS[i], ARGV[i + 3], ARGV[4])
+end
+write(KEYS[1], ARGV[2], ARGV[3])
+return existing
+"""
+
+
+class RedisKeyWatch(KeyWatch):
+    _pubsub: PubSub | None
+
+    def __init__(self, pubsub: PubSub):
+        self._pubsub = pubsub
+
+    def wait(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        if self._pubsub is None:
+            return super().wait(timeout)
+        try:
+            while (remaining := deadline - time.monotonic()) > 0:
+                if self._pubsub.get_message(timeout=remaining):
+                    return True
+            return False
+        except RedisError:
+            self._pubsub = None
+            return super().wait(max(0, deadline - time.monotonic()))
 
 
 class CacheRedis(CacheComponent):
@@ -23,18 +68,35 @@ class CacheRedis(CacheComponent):
 
     _url: str
 
+    _localCache: LRUCache | None
+
+    _submitScript: Script
+
     def __init__(self, config: Config):
         super().__init__(config)
         self._url = str(config.get("url"))
 
+        # optional in process cache for immutable keys, bounded in bytes
+        localsize = int(config.get("localsize") or 0)
+        self._localCache = (
+            LRUCache(localsize, float(config.get("localttl") or 0) or None)
+            if localsize > 0
+            else None
+        )
+
     @property
     def conn(self):
         return self._redisClient
 
+    @property
+    def localCache(self) -> LRUCache | None:
+        return self._localCache
+
     def _connect(self):
         if self.isOpen:
             return None
         self._redisClient = Redis.from_url(self._url)
+        self._submitScript = self._redisClient.register_script(SUBMIT_SCRIPT)
         self._isReady = self._redisClient.ping()
         self._isOpen = self._redisClient.ping()
         return None
@@ -47,26 +109,190 @@ class CacheRedis(CacheComponent):
             return True
         return False
 
-    def setKey(self, id: str, value: Any) -> str:
+    @timed(CACHE_SECONDS, "setKey")
+    def setKey(self, id: str, value: Any, expiry: int | None = None) -> str:
         if not self.isReady:
             self.connect()
-            return self.setKey(id, value)
-        self._redisClient.set(
-            id, simplejson.dumps(value, default=decimal_default, ignore_nan=True)
-        )
+            return self.setKey(id, value, expiry)
+        data = self._offload(id, self._serializer.dumps(value))
+        if self._offloadStorage is not None:
+            previous = self._redisClient.set(id, data, ex=expiry, get=True)
+            self._discardReplaced(previous, data)  # type: ignore
+            return id
+        self._redisClient.set(id, data, ex=expiry)
         return id
 
+    @timed(CACHE_SECONDS, "getKey")
     def getKey(self, id: str) -> Any | None:
         if not self.isReady:
             self.connect()
             return self.getKey(id)
         value = self._redisClient.get(id)
         if value:
-            return json.loads(value)  # type: ignore
-        return value
+            value = self._resolveOffload(value)  # type: ignore
+        if value:
+            return self._serializer.loads(value)  # type: ignore
+        return None
 
+    @timed(CACHE_SECONDS, "getImmutableKey")
+    def getImmutableKey(self, id: str) -> Any | None:
+        if self._localCache is None:
+            return self.getKey(id)
+        if not self.isReady:
+            self.connect()
+            return self.getImmutableKey(id)
+
+        # raw bytes are kept so every caller parses its own copy
+        value = self._localCache.get(id)
+        if value is None:
+            value = self._redisClient.get(id)  # type: ignore
+            if value:
+                value = self._resolveOffload(value)  # type: ignore
+            if not value:
+                return None
+            self._localCache.set(id, value)  # type: ignore
+        return self._serializer.loads(value)  # type: ignore
+
+    @timed(CACHE_SECONDS, "deleteKey")
     def deleteKey(self, id: str) -> bool:
         if not self.isReady:
             self.connect()
             return self.deleteKey(id)
+        if self._localCache is not None:
+            self._localCache.delete(id)
+        if self._offloadStorage is not None:
+            pipeline = self._redisClient.pipeline(transaction=True)
+            pipeline.get(id)
+            pipeline.delete(id)
+            value, deleted = pipeline.execute()
+            self._discardOffload(value)
+            return deleted > 0
         return self.conn.delete(id) > 0
+
+    @timed(CACHE_SECONDS, "setKeys")
+    def setKeys(self, values: Dict[str, Any], expiry: int | None = None) -> List[str]:
+        if not self.isReady:
+            self.connect()
+            return self.setKeys(values, expiry)
+        data = [
+            self._offload(id, self._serializer.dumps(value))
+            for id, value in values.items()
+        ]
+        replacing = self._offloadStorage is not None
+        pipeline = self._redisClient.pipeline(transaction=False)
+        for id, value in zip(values, data):
+            pipeline.set(id, value, ex=expiry, get=replacing)
+        previous = pipeline.execute()
+        if replacing:
+            for value, old in zip(data, previous):
+                self._discardReplaced(old, value)
+        return list(values.keys())
+
+    @timed(CACHE_SECONDS, "getKeys")
+    def getKeys(self, ids: List[str]) -> List[Any | None]:
+        if not self.isReady:
+            self.connect()
+            return self.getKeys(ids)
+        if not len(ids):
+            return []
+        values = [
+            self._resolveOffload(value) if value else None  # type: ignore
+            for value in self._redisClient.mget(ids)  # type: ignore
+        ]
+        return [self._serializer.loads(value) if value else None for value in values]
+
+    @timed(CACHE_SECONDS, "deleteKeys")
+    def deleteKeys(self, ids: List[str]) -> int:
+        if not self.isReady:
+            self.connect()
+            return self.deleteKeys(ids)
+        if not len(ids):
+            return 0
+        if self._localCache is not None:
+            for id in ids:
+                self._localCache.delete(id)
+        if self._offloadStorage is not None:
+            pipeline = self._redisClient.pipeline(transaction=True)
+            pipeline.mget(ids)
+            pipeline.delete(*ids)
+            values, deleted = pipeline.execute()
+            for value in values:
+                self._discardOffload(value)
+            return deleted
+        return self.conn.delete(*ids)
+
+    @timed(CACHE_SECONDS, "submit")
+    def submit(
+        self,
+        id: str,
+        arguments: Dict[str, Any],
+        progress: Any,
+        force: bool = False,
+    ) -> Any | None:
+        if not self.isReady:
+            self.connect()
+            return self.submit(id, arguments, progress, force)
+
+        # the dedup check and every write happen in one round trip
+        existing = self._submitScript(
+            keys=[id, *arguments.keys()],
+            args=[
+                "force" if force else "new",
+                self._offload(id, self._serializer.dumps(progress)),
+                self.progressTTL or 0,
+                self.argumentTTL or 0,
+                *[
+                    self._offload(argumentId, self._serializer.dumps(argument))
+                    for argumentId, argument in arguments.items()
+                ],
+            ],
+        )
+        if force:
+            self._discardOffload(existing)  # type: ignore
+            return None
+        if existing:
+            existing = self._resolveOffload(existing)  # type: ignore
+        return self._serializer.loads(existing) if existing else None
+
+    @timed(CACHE_SECONDS, "addToSet")
+    def addToSet(self, id: str, value: str, expiry: int | None = None) -> int:
+        if not self.isReady:
+            self.connect()
+            return self.addToSet(id, value, expiry)
+        pipeline = self._redisClient.pipeline(transaction=True)
+        pipeline.sadd(id, value)
+        pipeline.scard(id)
+        if expiry:
+            pipeline.expire(id, expiry)
+        added, size, *_ = pipeline.execute()
+        return size if added else 0
+
+    @timed(CACHE_SECONDS, "notifyKey")
+    def notifyKey(self, id: str) -> bool:
+        if not self.isReady:
+            self.connect()
+            return self.notifyKey(id)
+        return self._redisClient.publish(f"{NOTIFY_PREFIX}{id}", id) > 0
+
+    @contextmanager
+    def watchKey(self, id: str) -> Iterator[KeyWatch]:
+        if not self.isReady:
+            self.connect()
+        # one subscription, and so one connection, serves the whole watch
+        pubsub = self._redisClient.pubsub(ignore_subscribe_messages=True)
+        try:
+            try:
+                # the confirmation is awaited, so that the key is only read
+                # once notifications are being delivered
+                pubsub.subscribe(f"{NOTIFY_PREFIX}{id}")
+                pubsub.get_message(
+                    ignore_subscribe_messages=False, timeout=SUBSCRIBE_TIMEOUT
+                )
+                watch: KeyWatch = RedisKeyWatch(pubsub)
+
+            # pub/sub may be disabled or proxied away, wait like a plain cache
+            except RedisError:
+                watch = KeyWatch()
+            yield watch
+        finally:
+            pubsub.close()
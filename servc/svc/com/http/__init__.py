@@ -1,19 +1,31 @@
 import json
 import os
 from multiprocessing import Process
-from typing import Dict, List, Tuple, TypedDict
+from typing import Any, Dict, List, Tuple, TypedDict
 
-from flask import Flask, jsonify, request  # type: ignore
+from flask import (  # type: ignore
+    Flask,
+    Response,
+    jsonify,
+    request,
+    stream_with_context,
+)
 
 from servc.svc import ComponentType, Middleware
-from servc.svc.client.send import sendMessage
+from servc.svc.client.poll import watchResult
+from servc.svc.client.send import getMessageId, sendMessage, sendMessages
 from servc.svc.com.bus import BusComponent
 from servc.svc.com.cache import CacheComponent
 from servc.svc.com.worker import RESOLVER_MAPPING
+from servc.svc.com.worker.pool import ConsumerPool, detachProcess
 from servc.svc.config import Config
 from servc.svc.idgen.simple import simple
 from servc.svc.io.input import InputPayload, InputType
 from servc.svc.io.output import StatusCode
+from servc.svc.metrics import exposition, markProcessDead
+
+# seconds a gunicorn worker may take beyond conf.http.maxwait on a request
+WORKER_TIMEOUT_MARGIN = 30
 
 
 class ServiceInformation(TypedDict):
@@ -39,11 +51,19 @@ class HTTPInterface(Middleware):
 
     _server: Flask
 
+    _serverMode: str
+
+    _workers: int
+
+    _threads: int
+
+    _maxWait: float
+
     _bus: BusComponent
 
     _cache: CacheComponent
 
-    _consumer: Process
+    _consumer: Process | ConsumerPool
 
     _components: List[Middleware]
 
@@ -54,7 +74,7 @@ class HTTPInterface(Middleware):
         config: Config,
         bus: BusComponent,
         cache: CacheComponent,
-        consumerthread: Process,
+        consumerthread: Process | ConsumerPool,
         resolvers: RESOLVER_MAPPING,
         eventResolvers: RESOLVER_MAPPING,
         components: List[Middleware],
@@ -62,6 +82,12 @@ class HTTPInterface(Middleware):
         super().__init__(config)
         self._port = int(config.get("port"))
         self._server = Flask(__name__)
+        self._serverMode = str(config.get("server") or "flask")
+        if self._serverMode not in ("flask", "gunicorn"):
+            raise ValueError(f"Unknown http server: {self._serverMode}")
+        self._workers = int(config.get("workers") or 1)
+        self._threads = int(config.get("threads") or 1)
+        self._maxWait = float(config.get("maxwait") or 60)
 
         self._bus = bus
         self._cache = cache
@@ -77,13 +103,50 @@ class HTTPInterface(Middleware):
             "eventHandlers": methodGrabber(eventResolvers),
         }
 
+    def connect(self):
+        # connections are not shared across a fork, so each gunicorn worker
+        # connects the bus and cache itself once it starts
+        if self._serverMode == "gunicorn":
+            return self._connect()
+        return super().connect()
+
+    def connectChildren(self):
+        for child in self._children:
+            child.connect()
+
+    def detachConsumer(self):
+        if isinstance(self._consumer, ConsumerPool):
+            self._consumer.detach()
+        elif self._consumer:
+            detachProcess(self._consumer)
+
     def _connect(self):
         self.bindRoutes()
         self._isOpen = True
         self._isReady = True
         print("Listening on port", self._port, flush=True)
+        if self._serverMode == "gunicorn":
+            return self.serve()
         self._server.run(port=self._port, host="0.0.0.0")
 
+    def gunicornOptions(self) -> Dict[str, Any]:
+        return {
+            "bind": f"0.0.0.0:{self._port}",
+            "workers": self._workers,
+            "threads": self._threads,
+            # a sync worker is killed once a request outlasts the timeout, so
+            # long polls and streams of up to conf.http.maxwait need more
+            "timeout": int(self._maxWait) + WORKER_TIMEOUT_MARGIN,
+            "post_fork": lambda _server, _worker: self.detachConsumer(),
+            "post_worker_init": lambda _worker: self.connectChildren(),
+            "child_exit": lambda _server, worker: markProcessDead(worker.pid),
+        }
+
+    def serve(self):
+        from servc.svc.com.http.gunicorn import GunicornServer
+
+        GunicornServer(self._server, self.gunicornOptions()).run()
+
     def _close(self):
         self._consumer.terminate()
         self._consumer.close()
@@ -118,8 +181,40 @@ class HTTPInterface(Middleware):
         else:
             return "Not OK", StatusCode.SERVER_ERROR.value
 
+    def _getWait(self) -> float:
+        try:
+            wait = float(request.args.get("wait") or 0)
+        except ValueError:
+            wait = 0
+        return max(0, min(wait, self._maxWait))
+
     def _getResponse(self, id: str):
-        return jsonify(self._cache.getKey(id))
+        wait = self._getWait()
+        if not wait:
+            return jsonify(self._cache.getKey(id))
+
+        # long poll, answering as soon as the job completes. otherwise the
+        # answer is the same as without a wait, null for an unknown id
+        for result in watchResult(id, self._cache, wait):
+            pass
+        if result["progress"] != 100:
+            return jsonify(self._cache.getKey(id))
+        return jsonify(result)
+
+    def _streamResponse(self, id: str):
+        # server sent events, one per change of the result until it completes.
+        # clients such as EventSource reconnect once the stream times out
+        wait = self._getWait() or self._maxWait
+
+        def stream():
+            for result in watchResult(id, self._cache, wait):
+                yield f"data: {json.dumps(result)}\n\n"
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
 
     def _postMessage(self, extra_params: Dict | None = None):
         if not extra_params:
@@ -153,24 +248,9 @@ class HTTPInterface(Middleware):
                 self._bus.emitEvent(body["event"], body["details"])
                 return body
             elif body["type"] == InputType.INPUT.value:
-                must_have_keys = ["route", "argument"]
-                for key in must_have_keys:
-                    if key not in body:
-                        return f"missing key {key}", StatusCode.INVALID_INPUTS.value
-                payload: InputPayload = {
-                    "type": body["type"],
-                    "route": body["route"],
-                    "argumentId": "",
-                    "id": body["id"] if "id" in body else "",
-                    "argument": body["argument"],
-                }
-                if isinstance(payload["argument"]["inputs"], dict):
-                    payload["argument"]["inputs"] = {
-                        **payload["argument"]["inputs"],
-                        **extra_params,
-                    }
-                if "instanceId" in body:
-                    payload["instanceId"] = body["instanceId"]
+                payload, error = self._getInputPayload(body, extra_params)
+                if error:
+                    return error, StatusCode.INVALID_INPUTS.value
                 force: bool = True if "force" in body and body["force"] else False
 
                 res_id = sendMessage(
@@ -186,13 +266,106 @@ class HTTPInterface(Middleware):
 
         return f"Content-Type: {content_type} not supported"
 
+    def _getInputPayload(
+        self, body: Dict, extra_params: Dict
+    ) -> Tuple[InputPayload, str | None]:
+        payload: InputPayload = {
+            "type": InputType.INPUT.value,
+            "route": "",
+            "argumentId": "",
+            "id": "",
+        }
+        must_have_keys: List[str] = ["route", "argument"]
+        for key in must_have_keys:
+            if key not in body:
+                return payload, f"missing key {key}"
+
+        payload["route"] = body["route"]
+        payload["id"] = body["id"] if "id" in body else ""
+        payload["argument"] = body["argument"]
+        argument: Any = payload["argument"]
+        if not isinstance(argument, dict) or "inputs" not in argument:
+            return payload, "argument must be an object with inputs"
+        if isinstance(payload["argument"]["inputs"], dict):
+            payload["argument"]["inputs"] = {
+                **payload["argument"]["inputs"],
+                **extra_params,
+            }
+        if "instanceId" in body:
+            payload["instanceId"] = body["instanceId"]
+        if "force" in body and body["force"]:
+            payload["force"] = True
+        return payload, None
+
+    def _postBatch(self, extra_params: Dict | None = None):
+        if not extra_params:
+            extra_params = {}
+        body = request.get_json(silent=True)
+        if not isinstance(body, list) or not body:
+            return "bad request", StatusCode.INVALID_INPUTS.value
+
+        payloads: List[InputPayload] = []
+        for index, item in enumerate(body):
+            if not isinstance(item, dict):
+                return f"bad request at {index}", StatusCode.INVALID_INPUTS.value
+
+            # compatibility patch
+            if "inputs" in item and "argument" not in item and item["inputs"]:
+                item["argument"] = item["inputs"]
+            if item.get("type", InputType.INPUT.value) != InputType.INPUT.value:
+                return f"only inputs at {index}", StatusCode.INVALID_INPUTS.value
+
+            payload, error = self._getInputPayload(item, extra_params)
+            if error:
+                return f"{error} at {index}", StatusCode.INVALID_INPUTS.value
+            payloads.append(payload)
+
+        # identical inputs share an id, and are only published once
+        ids: List[str] = []
+        unique: Dict[str, InputPayload] = {}
+        for payload in payloads:
+            id = getMessageId(payload, self._bus, self._cache, simple)
+            ids.append(id)
+            if id not in unique:
+                unique[id] = {**payload, "id": id}
+        sendMessages(list(unique.values()), self._bus, self._cache, simple)
+        return jsonify(ids)
+
+    def _getResponses(self):
+        ids = [
+            id for value in request.args.getlist("id") for id in value.split(",") if id
+        ]
+        return jsonify(self._cache.getKeys(ids))
+
+    def _getMetrics(self):
+        try:
+            body, contentType = exposition()
+        except ImportError as e:
+            return str(e), StatusCode.METHOD_NOT_FOUND.value
+        return Response(body, content_type=contentType)
+
     def _getInformation(self):
         return jsonify(self._info)
 
     def bindRoutes(self):
         self._server.add_url_rule("/healthz", "healthz", self._health, methods=["GET"])
         self._server.add_url_rule("/readyz", "readyz", self._health, methods=["GET"])
+        self._server.add_url_rule(
+            "/metrics", "_getMetrics", self._getMetrics, methods=["GET"]
+        )
         self._server.add_url_rule(
             "/id/<id>", "_getResponse", self._getResponse, methods=["GET"]
         )
+        self._server.add_url_rule(
+            "/id/<id>/stream",
+            "_streamResponse",
+            self._streamResponse,
+            methods=["GET"],
+        )
+        self._server.add_url_rule(
+            "/ids", "_getResponses", self._getResponses, methods=["GET"]
+        )
+        self._server.add_url_rule(
+            "/batch", "_postBatch", self._postBatch, methods=["POST"]
+        )
         self._server.add_url_rule("/", "", self._postMessage, methods=["POST", "GET"])
@@ -2,24 +2,29 @@ import json
 import os
 from io import BytesIO
 from multiprocessing import Process
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Optional, Tuple
 
-from flask import jsonify, request, send_file, Response
+from flask import Response, jsonify, request, send_file
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import wrap_file
 
 from servc.svc import Middleware
 from servc.svc.com.bus import BusComponent
 from servc.svc.com.cache import CacheComponent
 from servc.svc.com.http import HTTPInterface
-from servc.svc.com.storage.blob import BlobStorage
+from servc.svc.com.storage.blob import BlobInfo, BlobStorage
 from servc.svc.com.worker import RESOLVER_MAPPING
+from servc.svc.com.worker.pool import ConsumerPool
 from servc.svc.config import Config
 from servc.svc.io.output import ResponseArtifact, StatusCode
 from servc.svc.io.response import getErrorArtifact
 from servc.util import findType
 
 
-def returnError(message: str, error: StatusCode = StatusCode.METHOD_NOT_FOUND) -> Response:
+def returnError(
+    message: str, error: StatusCode = StatusCode.METHOD_NOT_FOUND
+) -> Response:
     return jsonify(getErrorArtifact("", message, error))
 
 
@@ -33,7 +38,7 @@ class HTTPUpload(HTTPInterface):
         config: Config,
         bus: BusComponent,
         cache: CacheComponent,
-        consumerthread: Process,
+        consumerthread: Process | ConsumerPool,
         resolvers: RESOLVER_MAPPING,
         eventResolvers: RESOLVER_MAPPING,
         components: List[Middleware],
@@ -63,8 +68,10 @@ class HTTPUpload(HTTPInterface):
                 )
 
                 if file.filename != "":
-                    self._blobStorage.put_file(
-                        container, remote_filename, file.stream.read()
+                    # large uploads are spooled to disk by werkzeug, so the
+                    # stream is handed over without reading it into memory
+                    self._blobStorage.put_stream(
+                        container, remote_filename, file.stream
                     )
                     extra_params["files"].append(remote_filename)
 
@@ -77,10 +84,19 @@ class HTTPUpload(HTTPInterface):
             return returnError("Bad Response", StatusCode.INVALID_INPUTS)
 
         if isinstance(response, dict):
-            art: ResponseArtifact = response # type: ignore
+            art: ResponseArtifact = response  # type: ignore
             if "file" in art["responseBody"]:
+                container = art["responseBody"].get("container", self._uploadcontainer)
+                info = self._blobStorage.get_info(
+                    container, art["responseBody"]["file"]
+                )
+                if info is not None:
+                    return self._streamFile(
+                        container, art["responseBody"]["file"], info
+                    )
+
                 data = self._blobStorage.get_file(
-                    art["responseBody"].get("container", self._uploadcontainer),
+                    container,
                     art["responseBody"]["file"],
                 )
                 if data is None:
@@ -96,6 +112,38 @@ class HTTPUpload(HTTPInterface):
                 )
         return returnError("File not found", StatusCode.INVALID_INPUTS)
 
+    def _streamFile(self, container: str, file: str, info: BlobInfo) -> Response:
+        # with a ranged read, the file is read lazily, in blocks, and only for
+        # the requested range. make_conditional answers Range, If-Range,
+        # If-None-Match and If-Modified-Since requests from the etag and last
+        # modified date
+        stream = self._blobStorage.open_file(container, file, info)
+        if stream is None:
+            return returnError("File not found", StatusCode.INVALID_INPUTS)
+        response = Response(
+            wrap_file(request.environ, stream),
+            mimetype="application/octet-stream",
+            direct_passthrough=True,
+        )
+        response.content_length = info["size"]
+        response.headers.set(
+            "Content-Disposition", "attachment", filename=os.path.basename(file)
+        )
+        if "etag" in info:
+            response.set_etag(info["etag"])
+        if "lastModified" in info:
+            response.last_modified = info["lastModified"]
+        response.cache_control.no_cache = True
+
+        try:
+            response.make_conditional(
+                request.environ, accept_ranges=True, complete_length=info["size"]
+            )
+        except RequestedRangeNotSatisfiable:
+            response.close()
+            raise
+        return response
+
     def bindRoutes(self) -> None:
         super().bindRoutes()
         self._server.add_url_rule(
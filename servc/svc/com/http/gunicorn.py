@@ -0,0 +1,24 @@
+from typing import Any, Dict
+
+from flask import Flask  # type: ignore
+from gunicorn.app.base import BaseApplication  # type: ignore
+
+
+class GunicornServer(BaseApplication):
+    """
+    Serves a flask application from several gunicorn worker processes.
+    Options are gunicorn settings, including server hooks.
+    """
+
+    def __init__(self, application: Flask, options: Dict[str, Any]):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self) -> Flask:
+        return self.application
@@ -1,10 +1,21 @@
+import datetime
+import io
 from io import BytesIO
-from typing import List
+from typing import IO, List, NotRequired, TypedDict
 
 from servc.svc import ComponentType
 from servc.svc.com.storage import StorageComponent
 from servc.svc.config import Config
 
+# reads through open_file are fetched from the storage in blocks of this size
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+class BlobInfo(TypedDict):
+    size: int
+    etag: NotRequired[str]
+    lastModified: NotRequired[datetime.datetime]
+
 
 class BlobStorage(StorageComponent):
     name: str = "blob"
@@ -20,13 +31,106 @@ class BlobStorage(StorageComponent):
     def get_file(self, container: str, prefix: str) -> bytes | BytesIO:
         return b""
 
+    def get_info(self, container: str, prefix: str) -> BlobInfo | None:
+        """
+        Returns the size, and when known the etag and last modified date, of
+        a file. Storages that return None are read whole through get_file.
+        """
+        return None
+
+    def get_range(self, container: str, prefix: str, start: int, length: int) -> bytes:
+        """
+        Reads length bytes from start. This default reads the whole file;
+        storages should override it with a ranged read.
+        """
+        data = self.get_file(container, prefix)
+        if isinstance(data, BytesIO):
+            data = data.getvalue()
+        return (data or b"")[start : start + length]
+
+    def open_file(
+        self, container: str, prefix: str, info: BlobInfo | None = None
+    ) -> IO[bytes] | None:
+        """
+        Opens a file as a seekable, buffered stream that only fetches the
+        ranges which are read. Passing info saves looking it up again.
+        Storages without a ranged read fetch the file once instead.
+        """
+        if info is None:
+            info = self.get_info(container, prefix)
+        if info is None:
+            return None
+        if type(self).get_range is BlobStorage.get_range:
+            # each block would otherwise download the whole file again
+            data = self.get_file(container, prefix)
+            if data is None:
+                return None
+            return data if isinstance(data, BytesIO) else BytesIO(data)
+        return io.BufferedReader(
+            BlobReader(self, container, prefix, info["size"]), READ_BUFFER_SIZE
+        )
+
     def put_file(
         self, container: str, prefix: str, data: bytes | str | BytesIO
     ) -> None:
         pass
 
+    def put_stream(self, container: str, prefix: str, stream: IO[bytes]) -> None:
+        """
+        Writes a file from a file-like object. This default reads it whole;
+        storages should override it to upload in chunks with flat memory.
+        """
+        self.put_file(container, prefix, stream.read())
+
     def delete_file(self, container: str, prefix: str) -> None:
         pass
 
     def list_files(self, container: str, prefix: str = "") -> List[str]:
         return []
+
+
+class BlobReader(io.RawIOBase):
+    _storage: BlobStorage
+
+    _container: str
+
+    _prefix: str
+
+    _size: int
+
+    _position: int
+
+    def __init__(self, storage: BlobStorage, container: str, prefix: str, size: int):
+        self._storage = storage
+        self._container = container
+        self._prefix = prefix
+        self._size = size
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(0, offset)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self._size - self._position)
+        if length <= 0:
+            return 0
+        data = self._storage.get_range(
+            self._container, self._prefix, self._position, length
+        )
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
@@ -1,22 +1,22 @@
-from typing import Any, List, Tuple
+import asyncio
+import inspect
+import threading
+import time
+from typing import Any, Awaitable, Dict, List, Tuple
 
 from servc.svc import ComponentType, Middleware
 from servc.svc.com.bus import BusComponent, OnConsuming
 from servc.svc.com.cache import CacheComponent
 from servc.svc.com.worker.hooks import evaluate_post_hooks, evaluate_pre_hooks
-from servc.svc.com.worker.methods import evaluate_exit, get_artifact
+from servc.svc.com.worker.hooks.parallelize import get_reducer
+from servc.svc.com.worker.methods import evaluate_exit, get_artifact, resolver_error
 from servc.svc.com.worker.types import RESOLVER, RESOLVER_CONTEXT, RESOLVER_MAPPING
 from servc.svc.config import Config
-from servc.svc.io.input import InputType
-from servc.svc.io.output import (
-    InvalidInputsException,
-    MethodNotFoundException,
-    NoProcessingException,
-    NotAuthorizedException,
-    ResponseArtifact,
-    StatusCode,
-)
+from servc.svc.io.input import ArgumentArtifact, InputType
+from servc.svc.io.output import ResponseArtifact, StatusCode
 from servc.svc.io.response import getAnswerArtifact, getErrorArtifact
+from servc.svc.metrics import MESSAGES, QUEUE_WAIT_SECONDS, RESOLVER_SECONDS
+from servc.svc.tracing import span
 
 
 def HEALTHZ(_id: str, _any: Any, c: RESOLVER_CONTEXT) -> StatusCode:
@@ -26,6 +26,19 @@ def HEALTHZ(_id: str, _any: Any, c: RESOLVER_CONTEXT) -> StatusCode:
     return StatusCode.OK
 
 
+def resolver_name(message: Any, artifact: ArgumentArtifact | None) -> str:
+    if artifact is not None:
+        return artifact["method"]
+    return str(message.get("event", ""))
+
+
+def message_attributes(message: Any) -> Dict[str, str]:
+    return {
+        "servc.route": str(message.get("route", "")),
+        "servc.id": str(message.get("id", "")),
+    }
+
+
 class WorkerComponent(Middleware):
     name: str = "worker"
 
@@ -47,6 +60,12 @@ class WorkerComponent(Middleware):
 
     _busClass: type[BusComponent]
 
+    _publishers: List[BusComponent]
+
+    _publisherLocal: threading.local
+
+    _publisherLock: threading.Lock
+
     def __init__(
         self,
         resolvers: RESOLVER_MAPPING,
@@ -66,6 +85,9 @@ class WorkerComponent(Middleware):
         self._busClass = busClass
         self._cache = cache
         self._config = config
+        self._publishers = []
+        self._publisherLocal = threading.local()
+        self._publisherLock = threading.Lock()
         self._bindToEventExchange = (
             config.get(f"conf.{self.name}.bindtoeventexchange")
             if len(self._eventResolvers.keys()) > 0
@@ -83,10 +105,29 @@ class WorkerComponent(Middleware):
         self._isOpen = True
 
     def _close(self):
+        with self._publisherLock:
+            for publisher in self._publishers:
+                publisher.close()
+            self._publishers = []
+        self._publisherLocal = threading.local()
         self._isReady = False
         self._isOpen = False
         return True
 
+    def getPublisher(self) -> BusComponent:
+        # the subscribing bus owns the consumer loop, so resolvers publish
+        # through a separate connection. one is kept per thread and reused
+        # for every message; the bus reconnects on its own when it drops.
+        publisher: BusComponent | None = getattr(self._publisherLocal, "bus", None)
+        if publisher is None:
+            publisher = self._busClass(
+                self._config.get(f"conf.{self._bus.name}"),
+            )
+            self._publisherLocal.bus = publisher
+            with self._publisherLock:
+                self._publishers.append(publisher)
+        return publisher
+
     def connect(self):
         super().connect()
 
@@ -96,64 +137,140 @@ class WorkerComponent(Middleware):
         print(" Resolvers:", self._resolvers.keys(), flush=True)
         print(" Event Resolvers:", self._eventResolvers.keys(), flush=True)
         print(" Bind to Event Exchange:", self._bindToEventExchange, flush=True)
+        print(
+            " Concurrency:",
+            self._config.get(f"conf.{self.name}.concurrency"),
+            flush=True,
+        )
 
         self._bus.subscribe(
             self._bus.route,
             self.inputProcessor,
             self._onConsuming,
             bindEventExchange=self._bindToEventExchange,
+            concurrency=int(self._config.get(f"conf.{self.name}.concurrency") or 1),
         )
 
     def run_resolver(
         self, method: RESOLVER, context: RESOLVER_CONTEXT, args: Tuple[str, Any]
     ) -> Tuple[StatusCode, ResponseArtifact | None, Any | None]:
         id, payload = args
-        statuscode: StatusCode = StatusCode.OK
-        response: ResponseArtifact | None = None
-        error: Any = None
 
         try:
-            response = getAnswerArtifact(id, method(id, payload, context))
-        except NotAuthorizedException as e:
-            error = e
-            statuscode = StatusCode.NOT_AUTHORIZED
-            response = getErrorArtifact(id, str(e), StatusCode.NOT_AUTHORIZED)
-        except InvalidInputsException as e:
-            error = e
-            statuscode = StatusCode.INVALID_INPUTS
-            response = getErrorArtifact(id, str(e), StatusCode.INVALID_INPUTS)
-        except NoProcessingException:
-            statuscode = StatusCode.NO_PROCESSING
-        except MethodNotFoundException as e:
-            error = e
-            statuscode = StatusCode.METHOD_NOT_FOUND
-            response = getErrorArtifact(id, str(e), StatusCode.METHOD_NOT_FOUND)
+            return (
+                StatusCode.OK,
+                getAnswerArtifact(id, method(id, payload, context)),
+                None,
+            )
+        except Exception as e:
+            return resolver_error(id, e)
+
+    async def run_resolver_async(
+        self, method: RESOLVER, context: RESOLVER_CONTEXT, args: Tuple[str, Any]
+    ) -> Tuple[StatusCode, ResponseArtifact | None, Any | None]:
+        id, payload = args
+
+        try:
+            answer = await method(id, payload, context)  # type: ignore
+            return StatusCode.OK, getAnswerArtifact(id, answer), None
         except Exception as e:
-            error = e
-            statuscode = StatusCode.SERVER_ERROR
-            response = getErrorArtifact(id, str(e), StatusCode.SERVER_ERROR)
+            return resolver_error(id, e)
+
+    async def resolve_async(
+        self,
+        method: RESOLVER,
+        context: RESOLVER_CONTEXT,
+        message: Any,
+        args: Tuple[str, Any],
+        artifact: ArgumentArtifact | None,
+    ) -> StatusCode:
+        # runs after inputProcessor returned, so the trace is picked up from
+        # the message again
+        labels = message["route"], resolver_name(message, artifact)
+        with span("resolve_async", message, message_attributes(message)):
+            with (
+                RESOLVER_SECONDS.labels(*labels).time(),
+                span("resolver", attributes={"servc.method": labels[1]}),
+            ):
+                status_code, response, error = await self.run_resolver_async(
+                    method, context, args
+                )
 
-        return statuscode, response, error
+            # exits and hooks talk to the cache and bus synchronously, so they
+            # are kept off the event loop
+            return await asyncio.to_thread(
+                self.complete, message, artifact, status_code, response, error
+            )
 
-    def inputProcessor(self, message: Any) -> StatusCode:
+    def complete(
+        self,
+        message: Any,
+        artifact: ArgumentArtifact | None,
+        status_code: StatusCode,
+        response: ResponseArtifact | None,
+        error: Any | None,
+    ) -> StatusCode:
         workerConfig = self._config.get(f"conf.{self.name}")
-        bus = self._busClass(
-            self._config.get(f"conf.{self._bus.name}"),
-        )
-        cache = self._cache
-        context: RESOLVER_CONTEXT = {
-            "bus": bus,
-            "cache": cache,
+        context = self.getContext()
+        cache = context["cache"]
+        MESSAGES.labels(
+            message.get("route", ""),
+            resolver_name(message, artifact),
+            status_code.name,
+        ).inc()
+
+        # parts of a job with a reduce step do not write to the shared job
+        # id; their results are collected by the part hook instead
+        result = response
+        if artifact is not None:
+            if status_code == StatusCode.NO_PROCESSING:
+                return StatusCode.NO_PROCESSING
+            if get_reducer(self._resolvers, artifact):
+                result = None
+
+            evaluate_exit(message, result, cache, status_code, workerConfig, error)
+            evaluate_post_hooks(
+                context["bus"],
+                cache,
+                message,
+                artifact,
+                response,
+                self._resolvers,
+                context,
+            )
+
+        evaluate_exit(message, result, cache, status_code, workerConfig, error)
+
+        return StatusCode.INVALID_INPUTS
+
+    def getContext(self) -> RESOLVER_CONTEXT:
+        return {
+            "bus": self.getPublisher(),
+            "cache": self._cache,
             "middlewares": self._children,
             "config": self._config,
         }
 
+    def inputProcessor(self, message: Any) -> StatusCode | Awaitable[StatusCode]:
+        # continues the trace of whoever published the message
+        with span("inputProcessor", message, message_attributes(message)):
+            return self.processMessage(message)
+
+    def processMessage(self, message: Any) -> StatusCode | Awaitable[StatusCode]:
+        context = self.getContext()
+        bus = context["bus"]
+        cache = context["cache"]
+
         status_code: StatusCode = StatusCode.OK
         response: ResponseArtifact | None = None
         error: Any | None = None
 
         if "type" not in message or "route" not in message:
             return StatusCode.INVALID_INPUTS
+        if "sentAt" in message:
+            QUEUE_WAIT_SECONDS.labels(message["route"]).observe(
+                max(0, time.time() - message["sentAt"])
+            )
 
         if message["type"] in [InputType.EVENT.value, InputType.EVENT]:
             if (
@@ -170,11 +287,22 @@ class WorkerComponent(Middleware):
             if message["event"] not in self._eventResolvers:
                 return StatusCode.METHOD_NOT_FOUND
 
-            status_code, response, error = self.run_resolver(
-                self._eventResolvers[message["event"]],
-                context,
-                ("", {**message}),
-            )
+            eventResolver = self._eventResolvers[message["event"]]
+            if inspect.iscoroutinefunction(eventResolver):
+                return self.resolve_async(
+                    eventResolver, context, message, ("", {**message}), None
+                )
+
+            labels = message["route"], message["event"]
+            with (
+                RESOLVER_SECONDS.labels(*labels).time(),
+                span("resolver", attributes={"servc.event": labels[1]}),
+            ):
+                status_code, response, error = self.run_resolver(
+                    eventResolver,
+                    context,
+                    ("", {**message}),
+                )
 
         elif message["type"] in [InputType.INPUT.value, InputType.INPUT]:
             if "id" not in message or "argumentId" not in message:
@@ -208,19 +336,28 @@ class WorkerComponent(Middleware):
                     if not continueExecution:
                         return StatusCode.OK
 
-                    status_code, response, error = self.run_resolver(
-                        self._resolvers[artifact["method"]],
-                        context,
-                        (message["id"], artifact["inputs"]),
-                    )
-                    if status_code == StatusCode.NO_PROCESSING:
-                        return StatusCode.NO_PROCESSING
-
-                    evaluate_exit(
-                        message, response, cache, status_code, workerConfig, error
+                    resolver = self._resolvers[artifact["method"]]
+                    if inspect.iscoroutinefunction(resolver):
+                        return self.resolve_async(
+                            resolver,
+                            context,
+                            message,
+                            (message["id"], artifact["inputs"]),
+                            artifact,
+                        )
+
+                    labels = message["route"], artifact["method"]
+                    with (
+                        RESOLVER_SECONDS.labels(*labels).time(),
+                        span("resolver", attributes={"servc.method": labels[1]}),
+                    ):
+                        status_code, response, error = self.run_resolver(
+                            resolver,
+                            context,
+                            (message["id"], artifact["inputs"]),
+                        )
+                    return self.complete(
+                        message, artifact, status_code, response, error
                     )
-                    evaluate_post_hooks(bus, cache, message, artifact)
 
-        evaluate_exit(message, response, cache, status_code, workerConfig, error)
-
-        return StatusCode.INVALID_INPUTS
+        return self.complete(message, None, status_code, response, error)
@@ -3,11 +3,14 @@ from servc.svc.com.cache import CacheComponent
 from servc.svc.com.worker.hooks.oncomplete import process_complete_hook
 from servc.svc.com.worker.hooks.parallelize import (
     evaluate_part_pre_hook,
+    get_reducer,
     process_post_part_hook,
+    process_reduce_hook,
 )
 from servc.svc.com.worker.types import RESOLVER_CONTEXT, RESOLVER_MAPPING
 from servc.svc.io.hooks import Hooks, OnCompleteHook, PartHook
 from servc.svc.io.input import ArgumentArtifact, InputPayload
+from servc.svc.io.output import ResponseArtifact
 
 
 def evaluate_post_hooks(
@@ -15,6 +18,9 @@ def evaluate_post_hooks(
     cache: CacheComponent,
     message: InputPayload,
     artifact: ArgumentArtifact,
+    response: ResponseArtifact | None = None,
+    resolvers: RESOLVER_MAPPING = {},
+    context: RESOLVER_CONTEXT | None = None,
 ) -> bool:
     if "hooks" not in artifact or not isinstance(artifact["hooks"], dict):
         return False
@@ -26,10 +32,18 @@ def evaluate_post_hooks(
         ):
             return False
         partHook: PartHook = hooks["part"]
+        reducer = get_reducer(resolvers, artifact) if context else None
 
-        completed = process_post_part_hook(bus, cache, message, artifact, partHook)
+        completed = process_post_part_hook(
+            cache, message, partHook, response if reducer else None
+        )
         if not completed:
             return True
+        if reducer and context:
+            process_reduce_hook(cache, message, partHook, reducer, context)
+
+        # every part reported, so the set of completed parts is no longer needed
+        cache.deleteKey(partHook["part_queue"])
 
     if "on_complete" in hooks and isinstance(hooks["on_complete"], list):
         for hook in hooks["on_complete"]:
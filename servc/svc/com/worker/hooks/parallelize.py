@@ -1,44 +1,120 @@
-from typing import List
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, List
 
-from servc.svc.client.send import sendMessage
-from servc.svc.com.bus import BusComponent
+from servc.svc.client.send import sendMessages
 from servc.svc.com.cache import CacheComponent
-from servc.svc.com.worker.types import RESOLVER_CONTEXT, RESOLVER_MAPPING
+from servc.svc.com.worker.methods import evaluate_exit, resolver_error
+from servc.svc.com.worker.types import RESOLVER, RESOLVER_CONTEXT, RESOLVER_MAPPING
 from servc.svc.idgen.simple import simple as idGenerator
 from servc.svc.io.hooks import Hooks, OnCompleteHook, PartHook
 from servc.svc.io.input import ArgumentArtifact, InputPayload, InputType
+from servc.svc.io.output import ResponseArtifact, StatusCode
+from servc.svc.io.response import getAnswerArtifact
+
+REDUCE_CHUNK_SIZE = 100
+
+
+def get_part_key(partHook: PartHook, part_id: Any) -> str:
+    return f"{partHook['part_queue']}-{part_id}"
+
+
+def get_reducer(
+    resolvers: RESOLVER_MAPPING, artifact: ArgumentArtifact
+) -> RESOLVER | None:
+    if "part" not in artifact.get("hooks", {}):
+        return None
+    return resolvers.get(f"{artifact['method']}_reduce")
+
+
+def iterate_part_results(
+    cache: CacheComponent, partHook: PartHook
+) -> Iterator[ResponseArtifact | None]:
+    # part results are read lazily in chunks so a reducer never holds every
+    # part in memory at once
+    total = partHook["total_parts"]
+    for start in range(0, total, REDUCE_CHUNK_SIZE):
+        keys = [
+            get_part_key(partHook, i)
+            for i in range(start, min(start + REDUCE_CHUNK_SIZE, total))
+        ]
+        yield from cache.getKeys(keys)
 
 
 def process_post_part_hook(
-    bus: BusComponent,
     cache: CacheComponent,
     message: InputPayload,
-    artifact: ArgumentArtifact,
     partHook: PartHook,
+    response: ResponseArtifact | None = None,
 ) -> bool:
-    # publish message to part queue
-    payload: InputPayload = {
-        "id": "",
-        "type": InputType.INPUT.value,
-        "route": partHook["part_queue"],
-        "force": True,
-        "argumentId": "",
-        "argument": {
-            "method": str(partHook["part_id"]),
-            "inputs": {
-                "id": message["id"],
-                "method": artifact["method"],
-                "inputs": artifact["inputs"],
-            },
-        },
-    }
-    sendMessage(payload, bus, cache, idGenerator)
-
-    # check if all parts are complete
-    if bus.get_queue_length(partHook["part_queue"]) == partHook["total_parts"]:
-        bus.delete_queue(partHook["part_queue"])
-        return True
-    return False
+    # jobs with a reduce step keep every part result under its own key
+    if response is not None:
+        cache.setKey(
+            get_part_key(partHook, partHook["part_id"]), response, cache.resultTTL
+        )
+
+    # record the part as complete. the part queue names the set of
+    # completed part ids; adding to it is atomic and ignores redeliveries,
+    # so only the part that completes the set reports completion
+    completed = cache.addToSet(
+        partHook["part_queue"], str(partHook["part_id"]), cache.resultTTL
+    )
+    if response is not None and 0 < completed < partHook["total_parts"]:
+        cache.setProgress(
+            message["id"],
+            completed / partHook["total_parts"],
+            f"{completed} of {partHook['total_parts']} parts complete",
+        )
+    return completed == partHook["total_parts"]
+
+
+def run_reducer(
+    reducer: RESOLVER, id: str, results: Iterator[Any], context: RESOLVER_CONTEXT
+) -> Any:
+    if not inspect.iscoroutinefunction(reducer):
+        return reducer(id, results, context)
+
+    # hooks run synchronously, so an async reducer is run to completion on a
+    # loop of its own. when this thread already runs a loop, as RabbitMQ's
+    # consumer does, that loop goes on another thread
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(reducer(id, results, context))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, reducer(id, results, context)).result()
+
+
+def process_reduce_hook(
+    cache: CacheComponent,
+    message: InputPayload,
+    partHook: PartHook,
+    reducer: RESOLVER,
+    context: RESOLVER_CONTEXT,
+) -> StatusCode:
+    id = message["id"]
+    try:
+        results = iterate_part_results(cache, partHook)
+        response: ResponseArtifact | None = getAnswerArtifact(
+            id, run_reducer(reducer, id, results, context)
+        )
+        statusCode, error = StatusCode.OK, None
+    except Exception as e:
+        statusCode, response, error = resolver_error(id, e)
+
+    evaluate_exit(
+        message,
+        response,
+        cache,
+        statusCode,
+        context["config"].get("conf.worker"),
+        error,
+    )
+    cache.deleteKeys(
+        [get_part_key(partHook, i) for i in range(partHook["total_parts"])]
+    )
+    return statusCode
 
 
 def evaluate_part_pre_hook(
@@ -83,37 +159,37 @@ def evaluate_part_pre_hook(
             }
             complete_hook.append(newHook)
 
-    # create task queue
+    # set tracking completed parts, cleared in case the job is rerun
     task_queue = f"part.{route}-{method}-{message['id']}"
-    if len(jobs):
-        bus.create_queue(task_queue, False)
-
-    # publish messages to part queue
-    payload_template: InputPayload = {
-        "id": message["id"],
-        "type": InputType.INPUT.value,
-        "route": route,
-        "force": True,
-        "argumentId": "",
-        "argument": {
-            "method": method,
-            "inputs": {},
-            "hooks": {
-                **hooks,
-                "on_complete": complete_hook,
-                "part": {
-                    "part_id": 0,
-                    "total_parts": len(jobs),
-                    "part_queue": task_queue,
-                },
-            },
-        },
-    }
+    cache.deleteKey(task_queue)
+
+    # publish messages to part queue. each part gets its own argument and
+    # part hook while the (possibly large) on complete hooks are shared
+    payloads: List[InputPayload] = []
     for i, job in enumerate(jobs):
-        payload: InputPayload = {**payload_template}
-        payload["argument"]["inputs"] = job
-        payload["argument"]["hooks"]["part"]["part_id"] = i
-        sendMessage(payload, bus, cache, idGenerator)
+        payloads.append(
+            {
+                "id": message["id"],
+                "type": InputType.INPUT.value,
+                "route": route,
+                "force": True,
+                "argumentId": "",
+                "argument": {
+                    "method": method,
+                    "inputs": job,
+                    "hooks": {
+                        **hooks,
+                        "on_complete": complete_hook,
+                        "part": {
+                            "part_id": i,
+                            "total_parts": len(jobs),
+                            "part_queue": task_queue,
+                        },
+                    },
+                },
+            }
+        )
+    sendMessages(payloads, bus, cache, idGenerator)
 
     # do not continue execution
     return False
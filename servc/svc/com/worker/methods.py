@@ -3,10 +3,19 @@ from typing import Any, Tuple
 from servc.svc.com.cache import CacheComponent
 from servc.svc.config import Config
 from servc.svc.io.input import ArgumentArtifact, InputPayload
-from servc.svc.io.output import ResponseArtifact, StatusCode
+from servc.svc.io.output import (
+    InvalidInputsException,
+    MethodNotFoundException,
+    NoProcessingException,
+    NotAuthorizedException,
+    ResponseArtifact,
+    StatusCode,
+)
 from servc.svc.io.response import getErrorArtifact
+from servc.svc.tracing import traced
 
 
+@traced("evaluate_exit")
 def evaluate_exit(
     message: InputPayload,
     response: ResponseArtifact | None,
@@ -29,14 +38,16 @@ def evaluate_exit(
         exit(1)
 
     if response is not None and "id" in message and message["id"]:
-        cache.setKey(message["id"], response)
+        cache.setKey(message["id"], response, cache.resultTTL)
+        cache.notifyKey(message["id"])
 
 
+@traced("get_artifact")
 def get_artifact(
     message: InputPayload, cache: CacheComponent
 ) -> ArgumentArtifact | Tuple[StatusCode, ResponseArtifact]:
     artifact = (
-        cache.getKey(message["argumentId"])
+        cache.getImmutableKey(message["argumentId"])
         if message["argumentId"] not in ["raw", "plain"]
         else message["argument"]
     )
@@ -52,3 +63,33 @@ def get_artifact(
         )
 
     return artifact
+
+
+def resolver_error(
+    id: str, e: Exception
+) -> Tuple[StatusCode, ResponseArtifact | None, Any | None]:
+    if isinstance(e, NotAuthorizedException):
+        return (
+            StatusCode.NOT_AUTHORIZED,
+            getErrorArtifact(id, str(e), StatusCode.NOT_AUTHORIZED),
+            e,
+        )
+    if isinstance(e, InvalidInputsException):
+        return (
+            StatusCode.INVALID_INPUTS,
+            getErrorArtifact(id, str(e), StatusCode.INVALID_INPUTS),
+            e,
+        )
+    if isinstance(e, NoProcessingException):
+        return StatusCode.NO_PROCESSING, None, None
+    if isinstance(e, MethodNotFoundException):
+        return (
+            StatusCode.METHOD_NOT_FOUND,
+            getErrorArtifact(id, str(e), StatusCode.METHOD_NOT_FOUND),
+            e,
+        )
+    return (
+        StatusCode.SERVER_ERROR,
+        getErrorArtifact(id, str(e), StatusCode.SERVER_ERROR),
+        e,
+    )
@@ -0,0 +1,193 @@
+import multiprocessing
+import multiprocessing.process
+import os
+import threading
+import time
+from multiprocessing.process import BaseProcess
+from typing import Any, Callable, List, Tuple
+
+from servc.svc.metrics import markProcessDead
+
+
+def pidAlive(pid: int | None) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def processAlive(process: BaseProcess) -> bool:
+    try:
+        # another process may have reaped it, such as gunicorn's arbiter
+        return process.is_alive() and pidAlive(process.pid)
+    except AssertionError:
+        # only the parent may call is_alive, other processes check the pid
+        return pidAlive(process.pid)
+
+
+def detachProcess(process: BaseProcess):
+    # a forked process inherits multiprocessing's record of its parent's
+    # children, and would terminate and join them when it exits
+    multiprocessing.process._children.discard(process)  # type: ignore
+
+
+class ConsumerPool:
+    _target: Callable[..., Any]
+
+    _args: Tuple
+
+    _size: int
+
+    _interval: float
+
+    _maxBackoff: float
+
+    _context: Any
+
+    _processes: List[BaseProcess]
+
+    _started: List[float]
+
+    _failures: List[int]
+
+    _restartAt: List[float | None]
+
+    _stopped: threading.Event
+
+    _supervisor: threading.Thread | None
+
+    _owner: int
+
+    _pidTable: Any
+
+    def __init__(
+        self,
+        target: Callable[..., Any],
+        args: Tuple,
+        size: int = 1,
+        interval: float = 1.0,
+        maxBackoff: float = 60.0,
+    ):
+        self._target = target
+        self._args = args
+        self._size = max(1, size)
+        self._interval = interval
+        self._maxBackoff = maxBackoff
+        self._processes = []
+        self._started = [0.0] * self._size
+        self._failures = [0] * self._size
+        self._restartAt = [None] * self._size
+        self._stopped = threading.Event()
+        self._supervisor = None
+
+        # current pids, shared with processes forked from the owner later on
+        # (such as http workers) which cannot inspect the processes directly
+        self._owner = os.getpid()
+
+        # the pool relies on fork semantics: consumers and later forks share
+        # the pid table, and targets need not be picklable. other start
+        # methods are the default on some platforms and python versions
+        self._context = multiprocessing.get_context("fork")
+        self._pidTable = self._context.Array("q", self._size)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    # pids are read from the table, as the supervisor may be replacing the
+    # process objects at the same time
+    @property
+    def pid(self) -> int | None:
+        return self._pidTable[0] or None
+
+    @property
+    def pids(self) -> List[int | None]:
+        return [pid or None for pid in self._pidTable]
+
+    def _spawn(self, index: int) -> BaseProcess:
+        process = self._context.Process(
+            target=self._target, args=self._args, daemon=True
+        )
+        process.start()
+        self._pidTable[index] = process.pid
+        self._started[index] = time.monotonic()
+        self._restartAt[index] = None
+        return process
+
+    def _backoff(self, index: int) -> float:
+        # consumers that crash straight away are restarted after doubling
+        # delays, reset once one stays up for the longest delay
+        if time.monotonic() - self._started[index] >= self._maxBackoff:
+            self._failures[index] = 0
+        failures = self._failures[index]
+        self._failures[index] += 1
+        if not failures:
+            return 0
+        return min(self._interval * 2 ** (failures - 1), self._maxBackoff)
+
+    def start(self):
+        self._stopped.clear()
+        self._processes = [self._spawn(index) for index in range(self._size)]
+        self._supervisor = threading.Thread(target=self.supervise, daemon=True)
+        self._supervisor.start()
+
+    def supervise(self):
+        while not self._stopped.wait(self._interval):
+            for index, process in enumerate(self._processes):
+                if self._stopped.is_set() or processAlive(process):
+                    continue
+                if self._restartAt[index] is None:
+                    delay = self._backoff(index)
+                    self._restartAt[index] = time.monotonic() + delay
+                    print(
+                        "Consumer",
+                        process.pid,
+                        "exited with code",
+                        process.exitcode,
+                        f"restarting in {delay:g}s",
+                        flush=True,
+                    )
+                    markProcessDead(process.pid)
+                if time.monotonic() < (self._restartAt[index] or 0):
+                    continue
+                # replaced before closing, so is_alive never sees a closed one
+                self._processes[index] = self._spawn(index)
+                try:
+                    process.close()
+                except ValueError:
+                    # reaped elsewhere, so the process object never saw it exit
+                    pass
+
+    def is_alive(self) -> bool:
+        if os.getpid() != self._owner:
+            return all(pidAlive(pid) for pid in self._pidTable)
+        return len(self._processes) > 0 and all(
+            processAlive(x) for x in self._processes
+        )
+
+    def detach(self):
+        """
+        Called in processes forked from the owner, so their exit leaves the
+        consumers running.
+        """
+        for process in self._processes:
+            detachProcess(process)
+
+    def terminate(self):
+        self._stopped.set()
+        if self._supervisor:
+            self._supervisor.join()
+            self._supervisor = None
+        for process in self._processes:
+            process.terminate()
+
+    def close(self):
+        self._stopped.set()
+        for index, process in enumerate(self._processes):
+            process.join()
+            process.close()
+            self._pidTable[index] = 0
+        self._processes = []
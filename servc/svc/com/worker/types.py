@@ -1,4 +1,4 @@
-from typing import Any, Callable, Dict, List, TypedDict, Union
+from typing import Any, Awaitable, Callable, Dict, List, TypedDict, Union
 
 from servc.svc import Middleware
 from servc.svc.com.bus import BusComponent
@@ -20,7 +20,7 @@ class RESOLVER_CONTEXT(TypedDict):
 
 RESOLVER = Callable[
     [str, Any, RESOLVER_CONTEXT],
-    RESOLVER_RETURN_TYPE,
+    RESOLVER_RETURN_TYPE | Awaitable[RESOLVER_RETURN_TYPE],
 ]
 
 RESOLVER_MAPPING = Dict[str, RESOLVER]
@@ -7,19 +7,34 @@ import yaml
 
 defaults = {
     "conf.http.port": int(os.getenv("PORT", 3000)),
+    "conf.http.server": "flask",
+    "conf.http.workers": int(os.getenv("WEB_CONCURRENCY", 1)),
+    "conf.http.threads": 1,
+    "conf.http.maxwait": 60,
     "conf.instanceid": os.getenv("INSTANCE_ID", socket.gethostname()),
     "conf.cache.url": os.getenv(
         "CACHE_URL", os.getenv("REDIS_URL", "redis://localhost:6379")
     ),
+    "conf.cache.codec": "json",
+    "conf.cache.compression": "zlib",
+    "conf.cache.compressthreshold": 0,
     "conf.bus.url": os.getenv(
         "BUS_URL", os.getenv("CLOUDAMQP_URL", "amqp://localhost:5672")
     ),
     "conf.bus.route": os.getenv("CONF__BUS__QUEUE", os.getenv("QUEUE_NAME", "test")),
     "conf.bus.routemap": json.loads(os.getenv("CONF__BUS__ROUTEMAP", json.dumps({}))),
     "conf.bus.prefix": "",
+    # publish batches in AMQP transactions, so the broker has accepted every
+    # message of a batch once publishMany returns
+    "conf.bus.transactional": False,
+    "conf.bus.codec": "json",
+    "conf.bus.compression": "zlib",
+    "conf.bus.compressthreshold": 0,
     "conf.worker.bindtoeventexchange": True,
     "conf.worker.exiton5xx": True,
     "conf.worker.exiton4xx": False,
+    "conf.worker.concurrency": 1,
+    "conf.worker.processes": 1,
 }
 
 BOOLEAN_CONFIGS = os.getenv(
@@ -33,6 +48,7 @@ BOOLEAN_CONFIGS = os.getenv(
             "conf.worker.exiton4xx",
             "conf.worker.exiton5xx",
             "conf.worker.bindtoeventexchange",
+            "conf.bus.transactional",
         ]
     ),
 ).split(",")
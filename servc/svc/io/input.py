@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Any, NotRequired, TypedDict
+from typing import Any, Dict, NotRequired, TypedDict
 
 from servc.svc.io.hooks import Hooks
 
@@ -13,6 +13,8 @@ class GenericInput(TypedDict):
     type: str
     route: str
     force: NotRequired[bool]
+    sentAt: NotRequired[float]
+    traceContext: NotRequired[Dict[str, str]]
 
 
 class ArgumentArtifact(TypedDict):
@@ -0,0 +1,169 @@
+"""
+Prometheus metrics for workers, clients, caches and buses. Without
+prometheus_client installed every metric is a no-op.
+
+Consumers run in their own processes, so for /metrics to aggregate them set
+PROMETHEUS_MULTIPROC_DIR to an empty directory before the service starts.
+"""
+
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from typing import Any, Callable, Dict, Set, Tuple, TypeVar
+
+try:
+    from prometheus_client import (  # type: ignore
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+
+    ENABLED = True
+except ImportError:
+    ENABLED = False
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# distinct values kept per label fed from client input, later ones are counted
+# as OTHER_LABEL so the series, and the multiprocess files, stay bounded
+LABEL_LIMIT = 100
+
+OTHER_LABEL = "other"
+
+_labelValues: Dict[str, Set[str]] = {}
+
+_labelLock = threading.Lock()
+
+
+class NoopMetric:
+    def labels(self, *_args: Any, **_kwargs: Any) -> "NoopMetric":
+        return self
+
+    def inc(self, _amount: float = 1):
+        pass
+
+    def observe(self, _amount: float):
+        pass
+
+    def time(self) -> nullcontext:
+        return nullcontext()
+
+
+def counter(name: str, documentation: str, labels: Tuple[str, ...]) -> Any:
+    return Counter(name, documentation, labels) if ENABLED else NoopMetric()
+
+
+def histogram(name: str, documentation: str, labels: Tuple[str, ...]) -> Any:
+    return Histogram(name, documentation, labels) if ENABLED else NoopMetric()
+
+
+RESOLVER_SECONDS = histogram(
+    "servc_resolver_seconds",
+    "Time spent in resolvers",
+    ("route", "method"),
+)
+
+MESSAGES = counter(
+    "servc_messages_total",
+    "Messages processed by a worker, by status code",
+    ("route", "method", "status"),
+)
+
+QUEUE_WAIT_SECONDS = histogram(
+    "servc_queue_wait_seconds",
+    "Time between a message being sent and a worker picking it up",
+    ("route",),
+)
+
+SEND_SECONDS = histogram(
+    "servc_send_seconds",
+    "Time spent submitting and publishing a job with sendMessage",
+    ("route", "method"),
+)
+
+SENT = counter(
+    "servc_sent_total",
+    "Jobs published by sendMessage and sendMessages",
+    ("route", "method"),
+)
+
+CACHE_SECONDS = histogram(
+    "servc_cache_seconds",
+    "Cache call latency",
+    ("method",),
+)
+
+BUS_SECONDS = histogram(
+    "servc_bus_seconds",
+    "Bus call latency",
+    ("route", "method"),
+)
+
+PUBLISHED = counter(
+    "servc_bus_published_total",
+    "Messages published through the bus",
+    ("route",),
+)
+
+
+def timed(metric: Any, *labels: str) -> Callable[[F], F]:
+    """
+    Decorates a function to observe its duration on a histogram with fixed
+    label values.
+    """
+    child = metric.labels(*labels)
+
+    def decorator(fn: F) -> F:
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def boundLabel(name: str, value: str, limit: int = LABEL_LIMIT) -> str:
+    """
+    Returns value while the label has seen fewer than limit distinct values
+    in this process, and OTHER_LABEL for any new value after that.
+    """
+    with _labelLock:
+        values = _labelValues.setdefault(name, set())
+        if value in values:
+            return value
+        if len(values) >= limit:
+            return OTHER_LABEL
+        values.add(value)
+        return value
+
+
+def isMultiprocess() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def markProcessDead(pid: int | None):
+    """Drops the live gauges of an exited process in multiprocess mode."""
+    if ENABLED and pid and isMultiprocess():
+        multiprocess.mark_process_dead(pid)
+
+
+def exposition() -> Tuple[bytes, str]:
+    """Returns the text exposition of every metric and its content type."""
+    if not ENABLED:
+        raise ImportError("prometheus_client is not installed")
+    registry = REGISTRY
+    if isMultiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,115 @@
+"""
+OpenTelemetry tracing across bus hops. A sender's trace context travels in
+the traceContext field of each message, so the spans of a job, its parts and
+its on complete hooks form one trace across services. Without opentelemetry
+installed, or until a tracer provider is set, tracing is a no-op and costs
+next to nothing.
+
+Set conf.tracing.file to export spans as JSON lines for offline analysis.
+"""
+
+from contextlib import nullcontext
+from functools import wraps
+from typing import Any, Callable, ContextManager, Dict, TypeVar
+
+from servc.svc.config import Config
+
+try:
+    from opentelemetry import propagate, trace  # type: ignore
+
+    ENABLED = True
+except ImportError:
+    ENABLED = False
+
+TRACER_NAME = "servc"
+
+TRACE_FIELD = "traceContext"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_provider: Any = None
+
+
+def isActive() -> bool:
+    # the api hands out non-recording spans until a provider is set, which
+    # still cost a lot per message, so they are skipped altogether
+    return ENABLED and not isinstance(
+        trace.get_tracer_provider(), trace.ProxyTracerProvider
+    )
+
+
+def extract(message: Any) -> Any | None:
+    """Returns the trace context carried by a message, if any."""
+    if not ENABLED or not isinstance(message, dict) or TRACE_FIELD not in message:
+        return None
+    return propagate.extract(message[TRACE_FIELD])
+
+
+def inject(message: Any):
+    """Stores the current trace context in a message about to be published."""
+    if not isActive():
+        return
+    carrier: Dict[str, str] = {}
+    propagate.inject(carrier)
+    if carrier:
+        message[TRACE_FIELD] = carrier
+
+
+def span(
+    name: str, message: Any = None, attributes: Dict[str, Any] | None = None
+) -> ContextManager:
+    """
+    Starts a span as the current one. When a message carrying a trace
+    context is given, the span continues that trace.
+    """
+    if not isActive():
+        return nullcontext()
+    return trace.get_tracer(TRACER_NAME).start_as_current_span(
+        name, context=extract(message), attributes=attributes
+    )
+
+
+def annotate(attributes: Dict[str, Any]):
+    """Sets attributes on the current span."""
+    if isActive():
+        trace.get_current_span().set_attributes(attributes)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorates a function to run within a span."""
+
+    def decorator(fn: F) -> F:
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def setupTracing(config: Config):
+    """
+    Installs a tracer provider exporting to conf.tracing.file, named after
+    the service's route. Forked processes inherit the provider set up by
+    their parent. Other exporters are configured through the OpenTelemetry
+    SDK as usual.
+    """
+    global _provider
+    path = config.get("conf.tracing.file")
+    if not path or _provider is not None:
+        return _provider
+
+    from opentelemetry.sdk.resources import Resource  # type: ignore
+    from opentelemetry.sdk.trace import TracerProvider  # type: ignore
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor  # type: ignore
+
+    from servc.svc.tracing.file import FileSpanExporter
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": str(config.get("conf.bus.route"))})
+    )
+    _provider.add_span_processor(BatchSpanProcessor(FileSpanExporter(str(path))))
+    trace.set_tracer_provider(_provider)
+    return _provider
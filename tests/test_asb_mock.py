@@ -0,0 +1,71 @@
+import copy
+import unittest
+
+from azure.servicebus.exceptions import (
+    MessageSizeExceededError,
+    ServiceBusConnectionError,
+)
+
+from servc.svc.com.bus.asb import AzureServiceBus
+from servc.svc.config import Config
+
+
+class FakeBatch(list):
+    def __init__(self, size: int):
+        super().__init__()
+        self.size = size
+
+    def add_message(self, message):
+        if len(self) == self.size:
+            raise MessageSizeExceededError(message="batch is full")
+        self.append(message)
+
+
+class FlakySender:
+    def __init__(self, size: int, failAt: int | None = None):
+        self.size = size
+        self.failAt = failAt
+        self.batches = []
+
+    def create_message_batch(self):
+        return FakeBatch(self.size)
+
+    def send_messages(self, batch):
+        if len(self.batches) == self.failAt:
+            self.failAt = None
+            raise ServiceBusConnectionError(message="link detached")
+        self.batches.append([bytes(next(m.body)) for m in batch])
+
+    def close(self):
+        pass
+
+
+def mockBus(sender: FlakySender) -> AzureServiceBus:
+    # configs share their defaults, so the setting goes on a copy
+    config = Config()
+    config.setAll(copy.deepcopy(config.getAll()))
+    bus = AzureServiceBus(config.get("conf.bus"))
+    bus.get_sender = lambda _name: sender  # type: ignore
+    return bus
+
+
+class TestPublishBatch(unittest.TestCase):
+    def test_retries_unsent(self):
+        sender = FlakySender(size=2, failAt=1)
+        bus = mockBus(sender)
+        bodies = [str(i).encode() for i in range(5)]
+
+        bus.publish_batch("queue", bodies)
+        sent = [body for batch in sender.batches for body in batch]
+        self.assertEqual(sent, bodies)
+
+    def test_sends_in_batches(self):
+        sender = FlakySender(size=2)
+        bus = mockBus(sender)
+
+        bus.publish_batch("queue", [str(i).encode() for i in range(5)])
+        self.assertEqual([len(batch) for batch in sender.batches], [2, 2, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
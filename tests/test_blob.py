@@ -0,0 +1,75 @@
+import io
+import unittest
+
+from servc.svc.com.storage.blob import BlobStorage
+
+
+class MemoryBlob(BlobStorage):
+    def __init__(self, config):
+        super().__init__(config)
+        self.files = {}
+        self.reads = []
+
+    def get_file(self, container, prefix):
+        return self.files.get((container, prefix))
+
+    def get_info(self, container, prefix):
+        if (container, prefix) not in self.files:
+            return None
+        return {"size": len(self.files[(container, prefix)])}
+
+    def get_range(self, container, prefix, start, length):
+        self.reads.append((start, length))
+        return super().get_range(container, prefix, start, length)
+
+
+class UnrangedBlob(MemoryBlob):
+    get_range = BlobStorage.get_range
+
+    def get_file(self, container, prefix):
+        self.reads.append(prefix)
+        return super().get_file(container, prefix)
+
+
+class TestBlobStorage(unittest.TestCase):
+    def setUp(self):
+        self.blob = MemoryBlob({})
+        self.blob.files[("c", "f")] = bytes(range(100))
+
+    def test_get_range(self):
+        self.assertEqual(self.blob.get_range("c", "f", 10, 3), bytes([10, 11, 12]))
+        self.assertEqual(self.blob.get_range("c", "f", 98, 10), bytes([98, 99]))
+
+    def test_open_file(self):
+        stream = self.blob.open_file("c", "f")
+        self.assertTrue(stream.seekable())
+
+        stream.seek(50)
+        self.assertEqual(stream.read(2), bytes([50, 51]))
+        self.assertEqual(self.blob.reads, [(50, 50)])
+
+        stream.seek(-1, io.SEEK_END)
+        self.assertEqual(stream.read(), bytes([99]))
+        self.assertEqual(stream.read(), b"")
+
+    def test_open_unranged(self):
+        blob = UnrangedBlob({})
+        blob.files[("c", "f")] = bytes(range(100))
+        stream = blob.open_file("c", "f")
+
+        stream.seek(50)
+        self.assertEqual(stream.read(2), bytes([50, 51]))
+        self.assertEqual(stream.read(), bytes(range(52, 100)))
+        self.assertEqual(blob.reads, ["f"])
+
+    def test_open_missing(self):
+        self.assertIsNone(self.blob.open_file("c", "missing"))
+
+    def test_put_stream(self):
+        self.blob.put_file = lambda c, p, d: self.blob.files.update({(c, p): d})
+        self.blob.put_stream("c", "g", io.BytesIO(b"streamed"))
+        self.assertEqual(self.blob.files[("c", "g")], b"streamed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import copy
+import datetime
+import decimal
+import unittest
+
+from servc.svc.codec import (
+    CODECS,
+    COMPRESSORS,
+    Codec,
+    Serializer,
+    get_codec,
+    get_compressor,
+    get_serializer,
+)
+from servc.svc.config import Config
+
+ARTIFACT = {
+    "method": "test",
+    "inputs": {"rows": [{"id": i, "value": i / 3, "name": str(i)} for i in range(10)]},
+}
+
+
+def available(name: str, getter=get_codec) -> bool:
+    try:
+        getter(name)
+    except ImportError:
+        return False
+    return True
+
+
+class TestCodec(unittest.TestCase):
+    def test_roundtrip(self):
+        for name in CODECS:
+            if not available(name):
+                continue
+            codec = get_codec(name)
+            self.assertEqual(codec.loads(codec.dumps(ARTIFACT)), ARTIFACT, name)
+
+    def test_defaults(self):
+        now = datetime.datetime.now()
+        value = {"decimal": decimal.Decimal("10.5"), "date": now}
+        for name in CODECS:
+            if not available(name):
+                continue
+            codec = get_codec(name)
+            self.assertEqual(
+                codec.loads(codec.dumps(value)),
+                {"decimal": 10.5, "date": now.isoformat()},
+                name,
+            )
+
+    def test_legacy_payload(self):
+        legacy = b'{"method": "test", "inputs": 1}'
+        for name in CODECS:
+            if not available(name):
+                continue
+            self.assertEqual(
+                get_codec(name).loads(legacy), {"method": "test", "inputs": 1}
+            )
+        self.assertEqual(get_codec().loads(legacy.decode("utf-8"))["inputs"], 1)
+
+    def test_mixed_payloads(self):
+        json = get_codec()
+        self.assertIsInstance(json, Codec)
+        for name in CODECS:
+            if not available(name):
+                continue
+            payload = get_codec(name).dumps(ARTIFACT)
+            self.assertEqual(json.loads(payload), ARTIFACT, name)
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            get_codec("unknown")
+        with self.assertRaises(ValueError):
+            get_codec().loads(b"\x00?payload")
+
+    def test_compression(self):
+        plain = get_codec().dumps(ARTIFACT)
+        for name in COMPRESSORS:
+            if not available(name, get_compressor):
+                continue
+            serializer = Serializer(get_codec(), get_compressor(name), 100)
+            data = serializer.dumps(ARTIFACT)
+            self.assertLess(len(data), len(plain), name)
+            self.assertEqual(serializer.loads(data), ARTIFACT, name)
+
+            # readers without compression configured still decode it
+            self.assertEqual(Serializer(get_codec()).loads(data), ARTIFACT, name)
+
+    def test_compression_threshold(self):
+        serializer = Serializer(get_codec(), get_compressor(), 100)
+        self.assertEqual(serializer.dumps({"a": 1}), b'{"a": 1}')
+
+    def test_serializer_config(self):
+        # configs share their defaults, so the setting goes on a copy
+        config = Config()
+        config.setAll(copy.deepcopy(config.getAll()))
+        self.assertIsNone(get_serializer(config.get("conf.cache")).compressor)
+
+        config.setValue("conf.cache.compressthreshold", "1024")
+        serializer = get_serializer(config.get("conf.cache"))
+        self.assertEqual(serializer.threshold, 1024)
+        self.assertEqual(serializer.compressor, get_compressor("zlib"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import copy
+import threading
+import time
+import unittest
+import uuid
+
+from servc.svc.com.bus.rabbitmq import BusRabbitMQ
+from servc.svc.com.cache.redis import CacheRedis
+from servc.svc.com.http import HTTPInterface
+from servc.svc.config import Config
+from servc.svc.io.response import getAnswerArtifact
+
+queue = str(uuid.uuid4())
+
+
+def payload(i: int):
+    return {
+        "type": "input",
+        "route": queue,
+        "argument": {"method": "test", "inputs": {"i": i}},
+    }
+
+
+class TestHTTP(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        config = Config()
+        cls.bus = BusRabbitMQ(config.get(f"conf.{BusRabbitMQ.name}"))
+        cls.cache = CacheRedis(config.get(f"conf.{CacheRedis.name}"))
+        cls.http = HTTPInterface(
+            config.get(f"conf.{HTTPInterface.name}"),
+            cls.bus,
+            cls.cache,
+            None,
+            {},
+            {},
+            [],
+        )
+        cls.http.bindRoutes()
+
+        cls.http._server.testing = True
+        cls.client = cls.http._server.test_client()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.bus.close()
+        cls.cache.close()
+
+    def setUp(self):
+        self.bus.create_queue(queue, False)
+
+    def tearDown(self):
+        self.bus.delete_queue(queue)
+
+    def test_batch(self):
+        res = self.client.post("/batch", json=[payload(i) for i in range(5)])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(set(res.json)), 5)
+        self.assertEqual(self.bus.get_queue_length(queue), 5)
+
+        single = self.client.post("/", json={**payload(0), "force": True})
+        self.assertEqual(single.data.decode("utf-8"), res.json[0])
+
+    def test_batch_duplicates(self):
+        res = self.client.post("/batch", json=[payload(0), payload(1), payload(0)])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json[0], res.json[2])
+        self.assertEqual(self.bus.get_queue_length(queue), 2)
+
+    def test_invalid_argument(self):
+        res = self.client.post("/batch", json=[{**payload(0), "argument": [1]}])
+        self.assertEqual(res.status_code, 422)
+
+        res = self.client.post("/", json={**payload(0), "argument": "test"})
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(self.bus.get_queue_length(queue), 0)
+
+    def test_batch_invalid(self):
+        res = self.client.post("/batch", json=[payload(0), {"type": "input"}])
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(self.bus.get_queue_length(queue), 0)
+
+        res = self.client.post("/batch", json={"type": "input"})
+        self.assertEqual(res.status_code, 422)
+
+    def test_unknown_server(self):
+        # configs share their defaults, so the setting goes on a copy
+        config = Config()
+        config.setAll(copy.deepcopy(config.getAll()))
+        config.setValue("conf.http.server", "unknown")
+        with self.assertRaises(ValueError):
+            HTTPInterface(
+                config.get(f"conf.{HTTPInterface.name}"),
+                self.bus,
+                self.cache,
+                None,
+                {},
+                {},
+                [],
+            )
+
+    def test_get_ids(self):
+        self.cache.setKey("test_http_a", getAnswerArtifact("test_http_a", 1))
+        self.cache.deleteKey("test_http_b")
+
+        res = self.client.get("/ids?id=test_http_a,test_http_b&id=test_http_a")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json[0]["responseBody"], 1)
+        self.assertIsNone(res.json[1])
+        self.assertEqual(res.json[2]["responseBody"], 1)
+        self.cache.deleteKey("test_http_a")
+
+    def finish_later(self, id: str):
+        def finish():
+            time.sleep(0.2)
+            self.cache.setProgress(id, 0.5, "halfway")
+            time.sleep(0.2)
+            self.cache.setKey(id, getAnswerArtifact(id, 1))
+            self.cache.notifyKey(id)
+
+        self.cache.deleteKey(id)
+        threading.Thread(target=finish).start()
+
+    def test_long_poll(self):
+        self.finish_later("test_http_wait")
+        res = self.client.get("/id/test_http_wait?wait=5")
+        self.assertEqual(res.json["progress"], 100)
+        self.assertEqual(res.json["responseBody"], 1)
+        self.cache.deleteKey("test_http_wait")
+
+    def test_long_poll_unknown(self):
+        self.cache.deleteKey("test_http_unknown")
+        res = self.client.get("/id/test_http_unknown?wait=0.1")
+        self.assertIsNone(res.json)
+        self.assertIsNone(self.client.get("/id/test_http_unknown").json)
+
+    def test_worker_timeout(self):
+        self.assertGreater(self.http.gunicornOptions()["timeout"], self.http._maxWait)
+
+    def test_stream(self):
+        self.finish_later("test_http_stream")
+        res = self.client.get("/id/test_http_stream/stream?wait=5")
+        self.assertEqual(res.mimetype, "text/event-stream")
+
+        events = [x for x in res.get_data(as_text=True).split("\n\n") if x]
+        self.assertEqual(len(events), 3)
+        self.assertIn('"progress": 100', events[-1])
+        self.cache.deleteKey("test_http_stream")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import time
+import unittest
+
+from servc.svc.com.cache.lru import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_set(self):
+        cache = LRUCache(100)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", b"value")
+
+        self.assertEqual(cache.get("a"), b"value")
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.size, 5)
+
+    def test_evicts_least_recent(self):
+        cache = LRUCache(10)
+        cache.set("a", b"aaaa")
+        cache.set("b", b"bbbb")
+        cache.get("a")
+        cache.set("c", b"cccc")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), b"aaaa")
+        self.assertEqual(cache.get("c"), b"cccc")
+        self.assertEqual(cache.size, 8)
+
+    def test_oversized(self):
+        cache = LRUCache(4)
+        cache.set("a", b"too large")
+        self.assertEqual(len(cache), 0)
+
+    def test_replace_and_delete(self):
+        cache = LRUCache(100)
+        cache.set("a", b"aa")
+        cache.set("a", b"aaaa")
+        self.assertEqual(cache.size, 4)
+
+        cache.delete("a")
+        self.assertEqual(cache.size, 0)
+        self.assertIsNone(cache.get("a"))
+
+    def test_ttl(self):
+        cache = LRUCache(100, 0.01)
+        cache.set("a", b"aa")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
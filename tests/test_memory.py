@@ -0,0 +1,223 @@
+import asyncio
+import copy
+import threading
+import time
+import unittest
+
+from servc.svc.client.poll import pollMessage
+from servc.svc.client.send import sendMessage
+from servc.svc.com.bus.memory import BusMemory
+from servc.svc.com.cache.memory import CacheMemory
+from servc.svc.com.worker import WorkerComponent
+from servc.svc.config import Config
+from servc.svc.idgen.simple import simple
+from servc.svc.io.input import InputType
+from servc.svc.io.output import StatusCode
+from servc.svc.io.response import getAnswerArtifact, getProgressArtifact
+
+
+def memoryConfig(name: str) -> Config:
+    # configs share their defaults, so the memory urls go on a copy
+    config = Config()
+    config.setAll(copy.deepcopy(config.getAll()))
+    config.setValue("conf.bus.url", f"memory://{name}")
+    config.setValue("conf.bus.route", name)
+    config.setValue("conf.cache.url", f"memory://{name}")
+    return config
+
+
+class TestBusMemory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.bus = BusMemory(memoryConfig(self.id()).get("conf.bus"))
+
+    def tearDown(self) -> None:
+        self.bus.close()
+
+    def test_queue_length(self):
+        message = {"type": InputType.INPUT.value, "route": "q", "id": "1"}
+        self.bus.publishMessage("q", message)
+        self.assertEqual(self.bus.get_queue_length("q"), 0)
+
+        self.bus.create_queue("q", False)
+        self.bus.publishMany("q", [message, message])
+        self.assertEqual(self.bus.get_queue_length("q"), 2)
+
+        self.bus.delete_queue("q")
+        self.assertEqual(self.bus.get_queue_length("q"), 0)
+
+    def test_event_fanout(self):
+        self.bus.create_queue("bound", True)
+        self.bus.create_queue("other", True)
+        self.bus.create_queue("unbound", False)
+        self.bus.emitEvent("myevent", {"a": 1})
+
+        self.assertEqual(self.bus.get_queue_length("bound"), 1)
+        self.assertEqual(self.bus.get_queue_length("other"), 1)
+        self.assertEqual(self.bus.get_queue_length("unbound"), 0)
+
+    def test_shared_per_url(self):
+        other = BusMemory(memoryConfig(self.id()).get("conf.bus"))
+        self.bus.create_queue("q", False)
+        other.publishMessage("q", {"type": InputType.INPUT.value, "route": "q"})
+        self.assertEqual(self.bus.get_queue_length("q"), 1)
+
+    def test_subscribe_requeues(self):
+        seen = []
+
+        def processor(message):
+            seen.append(message["id"])
+            if len(seen) == 1:
+                return StatusCode.NO_PROCESSING
+            self.bus.close()
+            return StatusCode.OK
+
+        self.bus.create_queue("q", False)
+        self.bus.publishMessage(
+            "q", {"type": InputType.INPUT.value, "route": "q", "id": "1"}
+        )
+        self.bus.subscribe("q", processor, None, False, concurrency=2)
+
+        self.assertEqual(seen, ["1", "1"])
+        self.assertEqual(self.bus.get_queue_length("q"), 0)
+
+    def test_subscribe_async(self):
+        loops = []
+
+        async def processor(message):
+            loops.append(asyncio.get_running_loop())
+            if len(loops) == 2:
+                self.bus.close()
+            return StatusCode.OK
+
+        self.bus.create_queue("q", False)
+        message = {"type": InputType.INPUT.value, "route": "q", "id": "1"}
+        self.bus.publishMany("q", [message, message])
+        self.bus.subscribe("q", processor, None, False)
+
+        # resolvers on a thread share its event loop
+        self.assertEqual(len(loops), 2)
+        self.assertIs(loops[0], loops[1])
+        self.assertEqual(self.bus.get_queue_length("q"), 0)
+
+
+class TestCacheMemory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = CacheMemory(memoryConfig(self.id()).get("conf.cache"))
+
+    def test_keys(self):
+        self.cache.setKey("a", {"x": 1})
+        self.cache.setKeys({"b": 2, "c": 3})
+        self.assertEqual(self.cache.getKey("a"), {"x": 1})
+        self.assertEqual(self.cache.getKeys(["b", "missing", "c"]), [2, None, 3])
+        self.assertEqual(self.cache.deleteKeys(["a", "b", "missing"]), 2)
+        self.assertIsNone(self.cache.getKey("a"))
+
+    def test_expiry(self):
+        self.cache.setKey("a", 1, 1)
+        self.assertEqual(self.cache.getKey("a"), 1)
+        time.sleep(1.1)
+        self.assertIsNone(self.cache.getKey("a"))
+
+    def test_add_to_set(self):
+        self.assertEqual(self.cache.addToSet("s", "1"), 1)
+        self.assertEqual(self.cache.addToSet("s", "1"), 0)
+        self.assertEqual(self.cache.addToSet("s", "2"), 2)
+
+    def test_submit(self):
+        progress = getProgressArtifact("job", 0, "Starting")
+        self.assertIsNone(self.cache.submit("job", {"job-arg": [1]}, progress))
+        self.assertEqual(self.cache.getKey("job-arg"), [1])
+
+        answer = getAnswerArtifact("job", 1)
+        self.cache.setKey("job", answer)
+        self.assertEqual(self.cache.submit("job", {}, progress), answer)
+        self.assertIsNone(self.cache.submit("job", {}, progress, True))
+        self.assertEqual(self.cache.getKey("job"), progress)
+
+    def test_wait_key(self):
+        self.assertFalse(self.cache.notifyKey("k"))
+        self.assertFalse(self.cache.waitKey("k", 0.05))
+
+        timer = threading.Timer(0.05, self.cache.notifyKey, ["k"])
+        timer.start()
+        self.assertTrue(self.cache.waitKey("k", 5))
+        timer.join()
+
+    def test_watch_key(self):
+        with self.cache.watchKey("k") as watch:
+            # notifications between waits are kept for the next one
+            self.assertTrue(self.cache.notifyKey("k"))
+            self.assertTrue(watch.wait(0))
+            self.assertFalse(watch.wait(0.05))
+        self.assertFalse(self.cache.notifyKey("k"))
+
+
+class TestMemoryWorker(unittest.TestCase):
+    def test_roundtrip(self):
+        config = memoryConfig(self.id())
+        config.setValue("conf.worker.concurrency", 2)
+        bus = BusMemory(config.get("conf.bus"))
+        cache = CacheMemory(config.get("conf.cache"))
+        resolvers = {"double": lambda _id, p, _c: p * 2}
+        worker = WorkerComponent(resolvers, {}, None, bus, BusMemory, cache, config)
+        bus.create_queue(bus.route, False)
+        consumer = threading.Thread(target=worker.connect)
+        consumer.start()
+
+        try:
+            id = sendMessage(
+                {
+                    "type": InputType.INPUT.value,
+                    "route": bus.route,
+                    "argumentId": "",
+                    "argument": {"method": "double", "inputs": 21},
+                },
+                bus,
+                cache,
+                simple,
+            )
+            self.assertEqual(pollMessage(id, cache, 5)["responseBody"], 42)
+        finally:
+            worker.close()
+            bus.close()
+            consumer.join()
+
+    def test_async_reduce(self):
+        config = memoryConfig(self.id())
+        bus = BusMemory(config.get("conf.bus"))
+        cache = CacheMemory(config.get("conf.cache"))
+
+        async def total(_id, results, _c):
+            return sum(result["responseBody"] for result in results)
+
+        resolvers = {
+            "square": lambda _id, p, _c: p * p,
+            "square_part": lambda _id, artifact, _c: artifact["inputs"],
+            "square_reduce": total,
+        }
+        worker = WorkerComponent(resolvers, {}, None, bus, BusMemory, cache, config)
+        bus.create_queue(bus.route, False)
+        consumer = threading.Thread(target=worker.connect)
+        consumer.start()
+
+        try:
+            id = sendMessage(
+                {
+                    "type": InputType.INPUT.value,
+                    "route": bus.route,
+                    "argumentId": "",
+                    "argument": {"method": "square", "inputs": [1, 2, 3]},
+                },
+                bus,
+                cache,
+                simple,
+            )
+            self.assertEqual(pollMessage(id, cache, 5)["responseBody"], 14)
+        finally:
+            worker.close()
+            bus.close()
+            consumer.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
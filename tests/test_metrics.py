@@ -0,0 +1,49 @@
+import unittest
+
+from servc.svc import metrics
+from servc.svc.metrics import (
+    CACHE_SECONDS,
+    OTHER_LABEL,
+    NoopMetric,
+    boundLabel,
+    exposition,
+    timed,
+)
+
+
+class TestMetrics(unittest.TestCase):
+    def test_noop(self):
+        metric = NoopMetric()
+        metric.labels("a", "b").inc()
+        metric.labels("a").observe(1)
+        with metric.labels("a").time():
+            pass
+
+    def test_timed(self):
+        @timed(CACHE_SECONDS, "test_timed")
+        def double(x):
+            return x * 2
+
+        self.assertEqual(double(2), 4)
+        self.assertEqual(double.__name__, "double")
+
+    def test_bound_label(self):
+        self.assertEqual(boundLabel("test_bound_label", "a", 2), "a")
+        self.assertEqual(boundLabel("test_bound_label", "b", 2), "b")
+        self.assertEqual(boundLabel("test_bound_label", "c", 2), OTHER_LABEL)
+        self.assertEqual(boundLabel("test_bound_label", "a", 2), "a")
+
+    @unittest.skipUnless(metrics.ENABLED, "prometheus_client is not installed")
+    def test_exposition(self):
+        @timed(CACHE_SECONDS, "test_exposition")
+        def noop():
+            pass
+
+        noop()
+        body, contentType = exposition()
+        self.assertIn("text/plain", contentType)
+        self.assertIn(b'servc_cache_seconds_count{method="test_exposition"} 1.0', body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,14 +5,17 @@ import pika
 
 from servc.svc.com.bus.rabbitmq import BusRabbitMQ
 from servc.svc.com.cache.redis import CacheRedis
+from servc.svc.com.worker.hooks import evaluate_post_hooks
 from servc.svc.com.worker.hooks.parallelize import (
     evaluate_part_pre_hook,
+    get_part_key,
     process_post_part_hook,
 )
 from servc.svc.com.worker.types import EMIT_EVENT, RESOLVER_MAPPING
 from servc.svc.config import Config
 from servc.svc.io.hooks import PartHook
 from servc.svc.io.input import ArgumentArtifact, InputPayload, InputType
+from servc.svc.io.response import getAnswerArtifact
 
 message: InputPayload = {
     "id": "123",
@@ -39,6 +42,11 @@ testMapping: RESOLVER_MAPPING = {
     "myothermethod": lambda *z: 1,
 }
 
+reduceMapping: RESOLVER_MAPPING = {
+    "test": lambda _m, p, _c: p,
+    "test_reduce": lambda _m, results, _c: sum(x["responseBody"] for x in results),
+}
+
 emit: EMIT_EVENT = lambda x, y: None
 
 
@@ -61,33 +69,84 @@ class TestParallelize(unittest.TestCase):
 
     @classmethod
     def tearDownClass(cls) -> None:
-        cls.bus.delete_queue("test_part")
+        cls.cache.deleteKey("test_part")
         cls.cache.close()
         cls.bus.close()
         cls.channel.close()
         cls.conn.close()
 
     def tearDown(self):
-        self.bus.delete_queue("test_part")
+        self.cache.deleteKey("test_part")
 
     def test_part_queue(self):
-        res = process_post_part_hook(self.bus, self.cache, message, art, partHook)
+        res = process_post_part_hook(self.cache, message, partHook)
         self.assertFalse(res)
 
     def test_existing_part_queue(self):
-        self.bus.create_queue("test_part", False)
-        self.bus.publishMessage("test_part", "test")
+        self.cache.addToSet("test_part", "other_part")
+
+        res = process_post_part_hook(self.cache, message, partHook)
+        self.assertTrue(res)
+
+    def test_repeated_part(self):
+        self.cache.addToSet("test_part", "other_part")
 
-        res = process_post_part_hook(self.bus, self.cache, message, art, partHook)
+        res = process_post_part_hook(self.cache, message, partHook)
         self.assertTrue(res)
+        res = process_post_part_hook(self.cache, message, partHook)
+        self.assertFalse(res)
 
     def test_greater_than_total_parts(self):
-        self.bus.create_queue("test_part", False)
-        self.bus.publishMessage("test_part", "test")
-        self.bus.publishMessage("test_part", "test")
+        self.cache.addToSet("test_part", "other_part")
+        self.cache.addToSet("test_part", "another_part")
+
+        res = process_post_part_hook(self.cache, message, partHook)
+        self.assertFalse(res)
+
+    def test_reduce(self):
+        self.cache.deleteKey(message["id"])
+        art2 = json.loads(json.dumps(art))
+        art2["hooks"]["part"]["part_id"] = 0
+        res = evaluate_post_hooks(
+            self.bus,
+            self.cache,
+            message,
+            art2,
+            getAnswerArtifact(message["id"], 1),
+            reduceMapping,
+            self.context,
+        )
+        self.assertTrue(res)
+        self.assertEqual(self.cache.getKey(message["id"])["progress"], 50)
+
+        art2["hooks"]["part"]["part_id"] = 1
+        evaluate_post_hooks(
+            self.bus,
+            self.cache,
+            message,
+            art2,
+            getAnswerArtifact(message["id"], 2),
+            reduceMapping,
+            self.context,
+        )
+        result = self.cache.getKey(message["id"])
+        self.assertEqual(result["progress"], 100)
+        self.assertEqual(result["responseBody"], 3)
+        self.assertIsNone(self.cache.getKey(get_part_key(partHook, 0)))
+
+        # the set of completed parts was deleted, so this starts a new one
+        self.assertEqual(self.cache.addToSet(partHook["part_queue"], "0"), 1)
+
+    def test_no_part_queue_created(self):
+        self.bus._route = "test"
+        art2 = json.loads(json.dumps(art))
+        art2["method"] = "mymethod"
+        del art2["hooks"]["part"]
+        queue = f"part.test-mymethod-{message['id']}"
 
-        res = process_post_part_hook(self.bus, self.cache, message, art, partHook)
+        res = evaluate_part_pre_hook(testMapping, message, art2, self.context)
         self.assertFalse(res)
+        self.assertEqual(self.bus.get_queue_length(queue), 0)
 
     def test_pre_hook_method_check(self):
         # continue because there is no part method
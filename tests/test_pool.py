@@ -0,0 +1,92 @@
+import multiprocessing
+import time
+import unittest
+
+from servc.svc.com.worker.pool import ConsumerPool
+
+
+def run_forever():
+    while True:
+        time.sleep(1)
+
+
+def exit_now():
+    exit(1)
+
+
+def exit_alive(pool: ConsumerPool):
+    exit(0 if pool.is_alive() else 1)
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestConsumerPool(unittest.TestCase):
+    def test_spawns_workers(self):
+        pool = ConsumerPool(run_forever, (), 3)
+        pool.start()
+        self.assertEqual(len(set(pool.pids)), 3)
+        self.assertTrue(pool.is_alive())
+
+        pool.terminate()
+        pool.close()
+        self.assertFalse(pool.is_alive())
+
+    def test_restarts_exited_workers(self):
+        pool = ConsumerPool(exit_now, (), 2, interval=0.05)
+        pool.start()
+        first = pool.pids
+
+        self.assertTrue(wait_for(lambda: set(first).isdisjoint(pool.pids)))
+
+        pool.terminate()
+        pool.close()
+
+    def test_restarts_back_off(self):
+        pool = ConsumerPool(exit_now, (), 1, interval=0.05, maxBackoff=10)
+        started = time.monotonic()
+        pool.start()
+        spawned = [pool.pid]
+
+        # restarted at once, then after 0.05s, 0.1s and 0.2s
+        while len(spawned) < 5:
+            self.assertTrue(wait_for(lambda: pool.pid != spawned[-1]))
+            spawned.append(pool.pid)
+        self.assertGreaterEqual(time.monotonic() - started, 0.35)
+
+        pool.terminate()
+        pool.close()
+
+    def test_backoff_delays(self):
+        pool = ConsumerPool(exit_now, (), 1, interval=0.05, maxBackoff=0.3)
+        pool._started[0] = time.monotonic()
+        delays = [pool._backoff(0) for _ in range(5)]
+        self.assertEqual(delays, [0, 0.05, 0.1, 0.2, 0.3])
+
+        # reset once a consumer stayed up for the longest delay
+        pool._started[0] -= 0.3
+        self.assertEqual(pool._backoff(0), 0)
+
+    def test_alive_from_forked_process(self):
+        pool = ConsumerPool(run_forever, (), 2)
+        pool.start()
+
+        # e.g. an http worker forked after the pool started
+        context = multiprocessing.get_context("fork")
+        checker = context.Process(target=exit_alive, args=(pool,))
+        checker.start()
+        checker.join()
+        self.assertEqual(checker.exitcode, 0)
+
+        pool.terminate()
+        pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
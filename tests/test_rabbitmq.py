@@ -1,3 +1,4 @@
+import copy
 import unittest
 
 import pika
@@ -116,6 +117,44 @@ class TestRabbitMQ(unittest.TestCase):
 
         self.bus.delete_queue(route)
 
+    def test_publish_reuses_channel(self):
+        route = "test_route"
+        self.bus.delete_queue(route)
+        self.bus.create_queue(route, False)
+
+        self.bus.publishMessage(route, "test_message")
+        channel = self.bus._publishChannel
+        self.bus.publishMessage(route, "test_message")
+
+        self.assertIsNotNone(channel)
+        self.assertIs(channel, self.bus._publishChannel)
+        self.assertEqual(self.bus.get_queue_length(route), 2)
+        self.bus.delete_queue(route)
+
+    def test_publish_many(self):
+        route = "test_route"
+        self.bus.delete_queue(route)
+        self.bus.create_queue(route, False)
+
+        self.assertTrue(self.bus.publishMany(route, ["test_message"] * 10))
+        self.assertEqual(self.bus.get_queue_length(route), 10)
+        self.bus.delete_queue(route)
+
+    def test_publish_many_transactional(self):
+        route = "test_route"
+        # configs share their defaults, so the setting goes on a copy
+        config = Config()
+        config.setAll(copy.deepcopy(config.getAll()))
+        config.setValue("conf.bus.transactional", True)
+        bus = BusRabbitMQ(config.get("conf.bus"))
+        bus.delete_queue(route)
+        bus.create_queue(route, False)
+
+        self.assertTrue(bus.publishMany(route, ["test_message"] * 10))
+        self.assertEqual(bus.get_queue_length(route), 10)
+        bus.delete_queue(route)
+        bus.close()
+
 
 if __name__ == "__main__":
     unittest.main()
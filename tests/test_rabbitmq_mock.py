@@ -0,0 +1,192 @@
+import asyncio
+import copy
+import unittest
+from unittest import mock
+
+import pika
+
+from servc.svc.com.bus.rabbitmq import BusRabbitMQ
+from servc.svc.config import Config
+from servc.svc.io.output import StatusCode
+
+
+class FlakyChannel:
+    def __init__(self, failAt: int | None = None):
+        self.failAt = failAt
+        self.published = []
+        self.commits = 0
+
+    def basic_publish(self, exchange, routing_key, properties, body):
+        if len(self.published) == self.failAt:
+            self.failAt = None
+            raise pika.exceptions.AMQPConnectionError("connection lost")
+        self.published.append(body)
+
+    def tx_commit(self):
+        self.commits += 1
+
+
+def mockBus(channel: FlakyChannel, transactional: bool = False) -> BusRabbitMQ:
+    # configs share their defaults, so the setting goes on a copy
+    config = Config()
+    config.setAll(copy.deepcopy(config.getAll()))
+    config.setValue("conf.bus.transactional", transactional)
+    bus = BusRabbitMQ(config.get("conf.bus"))
+    bus.publish_channel = lambda: channel  # type: ignore
+    bus._connect = mock.Mock()  # type: ignore
+    bus._conn = mock.Mock(spec=pika.BlockingConnection, is_open=True)
+    return bus
+
+
+class TestPublishMany(unittest.TestCase):
+    def test_retries_unpublished(self):
+        channel = FlakyChannel(failAt=2)
+        bus = mockBus(channel)
+
+        self.assertTrue(bus.publishMany("route", [{"n": i} for i in range(4)]))
+        self.assertEqual(len(channel.published), 4)
+        self.assertEqual(len(set(channel.published)), 4)
+        bus._connect.assert_called_once()
+
+    def test_retries_transaction(self):
+        channel = FlakyChannel(failAt=2)
+        bus = mockBus(channel, True)
+
+        # the broker discards the uncommitted messages, the batch is resent
+        self.assertTrue(bus.publishMany("route", [{"n": i} for i in range(4)]))
+        self.assertEqual(len(channel.published), 6)
+        self.assertEqual(channel.commits, 1)
+
+
+class ImmediateExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def callNow(fn, *args):
+    return fn(*args)
+
+
+def mockChannel() -> mock.Mock:
+    # call_soon_threadsafe runs the callback at once, as the ioloop would
+    channel = mock.Mock()
+    channel.connection.ioloop.call_soon_threadsafe.side_effect = callNow
+    return channel
+
+
+class TestOnMessage(unittest.TestCase):
+    def setUp(self):
+        self.bus = mockBus(FlakyChannel())
+        self.bus._close = mock.Mock()  # type: ignore
+        self.channel = mockChannel()
+        self.method = mock.Mock(delivery_tag=7)
+        self.body = self.bus.serializer.dumps({"id": "1"})
+
+    def test_executor_settles_on_ioloop(self):
+        seen = []
+
+        def processor(message):
+            seen.append(message)
+            return StatusCode.OK
+
+        self.bus.on_message(
+            self.channel, self.method, None, self.body, processor, ImmediateExecutor()
+        )
+        self.assertEqual(seen, [{"id": "1"}])
+        self.channel.connection.ioloop.call_soon_threadsafe.assert_called_once()
+        self.channel.basic_ack.assert_called_once_with(7)
+
+    def test_executor_closes_on_error(self):
+        error = ValueError("resolver failed")
+
+        def processor(_message):
+            raise error
+
+        self.bus.on_message(
+            self.channel, self.method, None, self.body, processor, ImmediateExecutor()
+        )
+        self.bus._close.assert_called_once_with(False, error)
+        self.channel.basic_ack.assert_not_called()
+
+    def test_executor_carries_exit(self):
+        def processor(_message):
+            exit(1)
+
+        self.bus.on_message(
+            self.channel, self.method, None, self.body, processor, ImmediateExecutor()
+        )
+        self.bus._close.assert_called_once()
+        self.assertIsInstance(self.bus._close.call_args.args[1], SystemExit)
+
+    def test_empty_body(self):
+        processor = mock.Mock()
+        self.bus.on_message(
+            self.channel, self.method, None, b"", processor, ImmediateExecutor()
+        )
+        processor.assert_not_called()
+        self.channel.basic_ack.assert_called_once_with(7)
+
+
+class TestSettleMessage(unittest.TestCase):
+    def setUp(self):
+        self.bus = mockBus(FlakyChannel())
+        self.bus._close = mock.Mock()  # type: ignore
+        self.loop = asyncio.new_event_loop()
+        self.channel = mock.Mock()
+        self.channel.connection.ioloop = self.loop
+
+    def tearDown(self):
+        self.loop.close()
+
+    def settle(self, result):
+        # scheduled outside of the loop, so the task must be bound to it
+        self.bus.settle_message(self.channel, 7, result)
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+
+    def test_status(self):
+        self.bus.settle_message(self.channel, 7, StatusCode.OK)
+        self.channel.basic_ack.assert_called_once_with(7)
+
+        self.bus.settle_message(self.channel, 8, StatusCode.NO_PROCESSING)
+        self.channel.basic_nack.assert_called_once_with(8)
+
+    def test_awaitable(self):
+        async def resolve():
+            return StatusCode.OK
+
+        self.settle(resolve())
+        self.channel.basic_ack.assert_called_once_with(7)
+        self.bus._close.assert_not_called()
+
+    def test_awaitable_no_processing(self):
+        async def resolve():
+            return StatusCode.NO_PROCESSING
+
+        self.settle(resolve())
+        self.channel.basic_nack.assert_called_once_with(7)
+        self.channel.basic_ack.assert_not_called()
+
+    def test_awaitable_error(self):
+        error = ValueError("resolver failed")
+
+        async def resolve():
+            raise error
+
+        self.settle(resolve())
+        self.bus._close.assert_called_once_with(False, error)
+        self.channel.basic_ack.assert_not_called()
+
+    def test_awaitable_cancelled(self):
+        async def resolve():
+            await asyncio.sleep(10)
+
+        self.bus.settle_message(self.channel, 7, resolve())
+        for task in asyncio.all_tasks(self.loop):
+            task.cancel()
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        self.bus._close.assert_called_once_with(False, "resolver task cancelled")
+        self.channel.basic_ack.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,37 @@
+import copy
 import datetime
 import decimal
+import threading
+import time
 import unittest
 
+from servc.svc.client.poll import pollMessage
 from servc.svc.com.cache.redis import CacheRedis
+from servc.svc.com.storage.blob import BlobStorage
 from servc.svc.config import Config
+from servc.svc.io.response import getAnswerArtifact
+
+
+def isolatedConfig() -> Config:
+    # configs share their defaults, so settings go on a copy
+    config = Config()
+    config.setAll(copy.deepcopy(config.getAll()))
+    return config
+
+
+class MemoryBlob(BlobStorage):
+    def __init__(self, config):
+        super().__init__(config)
+        self.files = {}
+
+    def get_file(self, container, prefix):
+        return self.files.get((container, prefix))
+
+    def put_file(self, container, prefix, data):
+        self.files[(container, prefix)] = data
+
+    def delete_file(self, container, prefix):
+        self.files.pop((container, prefix), None)
 
 
 class TestRedis(unittest.TestCase):
@@ -50,6 +78,152 @@ class TestRedis(unittest.TestCase):
         self.assertTrue(self.cache.deleteKey(key))
         self.assertIsNone(self.cache.getKey(key))
 
+    def test_bulk_keys(self):
+        values = {f"test_bulk_{i}": {"value": i} for i in range(5)}
+        self.assertEqual(self.cache.setKeys(values), list(values.keys()))
+        self.assertEqual(
+            self.cache.getKeys([*values.keys(), "fake_key"]),
+            [*values.values(), None],
+        )
+
+        self.assertEqual(self.cache.deleteKeys(list(values.keys())), 5)
+        self.assertEqual(self.cache.getKeys(list(values.keys())), [None] * 5)
+
+    def test_bulk_empty(self):
+        self.assertEqual(self.cache.getKeys([]), [])
+        self.assertEqual(self.cache.deleteKeys([]), 0)
+
+    def test_add_to_set(self):
+        key = "test_set"
+        self.cache.deleteKey(key)
+
+        self.assertEqual(self.cache.addToSet(key, "a"), 1)
+        self.assertEqual(self.cache.addToSet(key, "b"), 2)
+        self.assertEqual(self.cache.addToSet(key, "a"), 0)
+        self.cache.deleteKey(key)
+
+    def test_wait_key_timeout(self):
+        self.assertFalse(self.cache.waitKey("test_wait", 0.1))
+
+    def test_watch_key(self):
+        with self.cache.watchKey("test_watch") as watch:
+            # notifications between waits are kept for the next one
+            self.assertTrue(self.cache.notifyKey("test_watch"))
+            self.assertTrue(watch.wait(1))
+            self.assertFalse(watch.wait(0.1))
+
+    def test_poll_notified(self):
+        key = "test_poll"
+        self.cache.deleteKey(key)
+
+        def complete():
+            time.sleep(0.2)
+            self.cache.setKey(key, getAnswerArtifact(key, True))
+            self.cache.notifyKey(key)
+
+        threading.Thread(target=complete).start()
+        start = time.time()
+        result = pollMessage(key, self.cache, 5)
+
+        self.assertEqual(result["responseBody"], True)
+        self.assertLess(time.time() - start, 1)
+        self.cache.deleteKey(key)
+
+    def test_key_expiry(self):
+        key = "test_expiry"
+        self.cache.setKey(key, "test_value", 100)
+        self.assertGreater(self.cache.conn.ttl(key), 0)
+
+        self.cache.setKey(key, "test_value")
+        self.assertEqual(self.cache.conn.ttl(key), -1)
+        self.cache.deleteKey(key)
+
+    def test_ttl_config(self):
+        config = isolatedConfig()
+        config.setValue("conf.cache.argumentttl", "60")
+        config.setValue("conf.cache.resultttl", 120)
+        cache = CacheRedis(config.get("conf.cache"))
+
+        self.assertEqual(cache.argumentTTL, 60)
+        self.assertEqual(cache.resultTTL, 120)
+        self.assertIsNone(cache.progressTTL)
+
+    def test_progress_expiry(self):
+        key = "test_progress_expiry"
+        self.cache._progressTTL = 100
+        self.cache.setProgress(key, 0.5, "halfway")
+        self.cache._progressTTL = None
+
+        self.assertGreater(self.cache.conn.ttl(key), 0)
+        self.cache.deleteKey(key)
+
+    def test_immutable_key(self):
+        config = isolatedConfig()
+        config.setValue("conf.cache.localsize", 1024)
+        cache = CacheRedis(config.get("conf.cache"))
+        key = "test_immutable"
+
+        cache.setKey(key, {"a": 1})
+        first = cache.getImmutableKey(key)
+        first["a"] = 2
+        self.assertEqual(cache.getImmutableKey(key), {"a": 1})
+        self.assertEqual(cache.localCache.hits, 1)
+        self.assertEqual(cache.localCache.misses, 1)
+
+        cache.deleteKey(key)
+        self.assertIsNone(cache.getImmutableKey(key))
+        cache.close()
+
+    def test_offload(self):
+        config = isolatedConfig()
+        config.setValue("conf.cache.offloadthreshold", 100)
+        cache = CacheRedis(config.get("conf.cache"))
+        blob = MemoryBlob({})
+        cache.setOffloadStorage(blob)
+
+        cache.setKey("test_offload_big", {"value": "a" * 200})
+        cache.setKey("test_offload_small", {"value": "a"})
+        self.assertEqual(list(blob.files), [("servc-offload", "test_offload_big")])
+        self.assertEqual(cache.getKey("test_offload_big"), {"value": "a" * 200})
+        self.assertEqual(
+            cache.getKeys(["test_offload_big", "test_offload_small"]),
+            [{"value": "a" * 200}, {"value": "a"}],
+        )
+
+        cache.deleteKey("test_offload_big")
+        cache.deleteKey("test_offload_small")
+        self.assertEqual(blob.files, {})
+
+        # a value cached over an offloaded one takes its blob with it
+        cache.setKey("test_offload_big", {"value": "a" * 200})
+        cache.setKeys({"test_offload_big": {"value": "a" * 300}})
+        self.assertEqual(len(blob.files), 1)
+        cache.setKey("test_offload_big", {"value": "a"})
+        self.assertEqual(blob.files, {})
+        cache.setKeys({"test_offload_big": {"value": "a" * 200}})
+        cache.setKeys({"test_offload_big": {"value": "a"}})
+        self.assertEqual(blob.files, {})
+        cache.deleteKey("test_offload_big")
+        cache.close()
+
+    def test_submit(self):
+        key = "test_submit"
+        self.cache.deleteKeys([key, "test_submit_arg"])
+
+        self.assertIsNone(self.cache.submit(key, {"test_submit_arg": 1}, "started"))
+        self.assertEqual(self.cache.getKey("test_submit_arg"), 1)
+        self.assertEqual(self.cache.getKey(key), "started")
+
+        self.assertEqual(
+            self.cache.submit(key, {"test_submit_arg": 2}, "again"), "started"
+        )
+        self.assertEqual(self.cache.getKey("test_submit_arg"), 1)
+
+        self.assertIsNone(self.cache.submit(key, {"test_submit_arg": 2}, "again", True))
+        self.assertEqual(self.cache.getKey("test_submit_arg"), 2)
+        self.assertEqual(self.cache.getKey(key), "again")
+        self.cache.deleteKeys([key, "test_submit_arg"])
+
     def test_close_twice(self):
         self.cache.close()
         self.cache.close()
@@ -0,0 +1,75 @@
+import unittest
+import uuid
+
+import pika
+
+from servc.svc.client.send import sendMessage, sendMessages
+from servc.svc.com.bus.rabbitmq import BusRabbitMQ
+from servc.svc.com.cache.redis import CacheRedis
+from servc.svc.config import Config
+from servc.svc.idgen.simple import simple
+from servc.svc.io.input import InputPayload, InputType
+from servc.svc.io.response import getAnswerArtifact
+from tests import get_route_message
+
+route = str(uuid.uuid4())
+
+
+def payload(i: int) -> InputPayload:
+    return {
+        "id": "",
+        "type": InputType.INPUT.value,
+        "route": route,
+        "argumentId": "",
+        "argument": {"method": "test", "inputs": i},
+    }
+
+
+class TestSend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        config = Config()
+        cls.bus = BusRabbitMQ(config.get("conf.bus"))
+        cls.cache = CacheRedis(config.get("conf.cache"))
+
+        params = pika.URLParameters(config.get("conf.bus.url"))
+        cls.conn = pika.BlockingConnection(params)
+        cls.channel = cls.conn.channel()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.cache.close()
+        cls.bus.close()
+        cls.channel.close()
+        cls.conn.close()
+
+    def setUp(self):
+        self.bus.create_queue(route, False)
+
+    def tearDown(self):
+        self.bus.delete_queue(route)
+
+    def test_send_messages(self):
+        messages = [payload(i) for i in range(10)]
+        ids = sendMessages(messages, self.bus, self.cache, simple, force=True)
+
+        self.assertEqual(len(set(ids)), 10)
+        self.assertEqual(ids[0], sendMessage(messages[0], self.bus, self.cache, simple))
+        self.assertEqual(self.bus.get_queue_length(route), 11)
+
+        body, _ = get_route_message(self.channel, self.cache, route)
+        self.assertEqual(body["argument"], messages[0]["argument"])
+
+    def test_send_messages_skips_completed(self):
+        messages = [payload(i) for i in range(3)]
+        ids = sendMessages(messages, self.bus, self.cache, simple, force=True)
+        self.cache.setKey(ids[1], getAnswerArtifact(ids[1], True))
+        self.bus.delete_queue(route)
+        self.bus.create_queue(route, False)
+
+        self.assertEqual(sendMessages(messages, self.bus, self.cache, simple), ids)
+        self.assertEqual(self.bus.get_queue_length(route), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
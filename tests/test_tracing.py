@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from servc.svc import tracing
+from servc.svc.tracing import TRACE_FIELD, extract, inject, span
+
+
+class TestTracing(unittest.TestCase):
+    def test_untraced_message(self):
+        message = {"type": "input", "route": "test"}
+        inject(message)
+        self.assertNotIn(TRACE_FIELD, message)
+        self.assertIsNone(extract(message))
+        with span("test", message):
+            pass
+
+    @unittest.skipUnless(tracing.ENABLED, "opentelemetry is not installed")
+    def test_propagation(self):
+        from opentelemetry import trace
+
+        parent = trace.SpanContext(
+            trace_id=1,
+            span_id=2,
+            is_remote=False,
+            trace_flags=trace.TraceFlags(trace.TraceFlags.SAMPLED),
+        )
+        message = {"type": "input", "route": "test"}
+        with mock.patch.object(tracing, "isActive", return_value=True):
+            with trace.use_span(trace.NonRecordingSpan(parent)):
+                inject(message)
+
+        self.assertIn("traceparent", message[TRACE_FIELD])
+        context = trace.get_current_span(extract(message)).get_span_context()
+        self.assertEqual(context.trace_id, 1)
+        self.assertEqual(context.span_id, 2)
+
+    def test_file_exporter(self):
+        try:
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        except ImportError:
+            self.skipTest("opentelemetry-sdk is not installed")
+        from servc.svc.tracing.file import FileSpanExporter
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "spans.jsonl")
+            provider = TracerProvider()
+            provider.add_span_processor(SimpleSpanProcessor(FileSpanExporter(path)))
+            tracer = provider.get_tracer("test")
+            with tracer.start_as_current_span("parent"):
+                with tracer.start_as_current_span("child"):
+                    pass
+
+            with open(path) as stream:
+                spans = [json.loads(line) for line in stream]
+        self.assertEqual([x["name"] for x in spans], ["child", "parent"])
+        self.assertEqual(spans[0]["parent_id"], spans[1]["context"]["span_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 import json
 import os
+import shutil
 import unittest
 import uuid
 
@@ -40,12 +41,29 @@ class MyBlob(BlobStorage):
         with open(os.path.join(self._basepath, container, prefix), "rb") as f:
             return f.read()
 
+    def get_info(self, container, prefix):
+        if not self.exists(container, prefix):
+            return None
+        stat = os.stat(os.path.join(self._basepath, container, prefix))
+        return {"size": stat.st_size, "etag": str(int(stat.st_mtime_ns))}
+
+    def get_range(self, container, prefix, start, length):
+        with open(os.path.join(self._basepath, container, prefix), "rb") as f:
+            f.seek(start)
+            return f.read(length)
+
     def put_file(self, container, prefix, data):
         if not os.path.exists(os.path.join(self._basepath, container)):
             os.makedirs(os.path.join(self._basepath, container))
         with open(os.path.join(self._basepath, container, prefix), "wb") as f:
             f.write(data)
 
+    def put_stream(self, container, prefix, stream):
+        if not os.path.exists(os.path.join(self._basepath, container)):
+            os.makedirs(os.path.join(self._basepath, container))
+        with open(os.path.join(self._basepath, container, prefix), "wb") as f:
+            shutil.copyfileobj(stream, f)
+
     def delete_file(self, container, prefix):
         if self.exists(container, prefix):
             os.remove(os.path.join(self._basepath, container, prefix))
@@ -137,6 +155,26 @@ class TestBasicUpload(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertEqual(res.data, b"Hello, World!")
 
+    def test_downloading_range(self):
+        response: ResponseArtifact = {
+            "id": "123456",
+            "isError": False,
+            "progress": 100,
+            "responseBody": {"file": "test3.txt"},
+            "statusCode": 200,
+        }
+        self.blob.put_file("uploads", "test3.txt", b"Hello, World!")
+        self.cache.setKey(response["id"], response)
+
+        res = self.client.get("/fid/123456", headers={"Range": "bytes=7-11"})
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res.data, b"World")
+        self.assertEqual(res.headers["Content-Range"], "bytes 7-11/13")
+
+        etag = res.headers["ETag"]
+        res = self.client.get("/fid/123456", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+
     def test_uploading_files(self):
         response = self.client.post(
             "/",
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import unittest
+
+from servc.svc.com.bus.rabbitmq import BusRabbitMQ
+from servc.svc.com.cache.redis import CacheRedis
+from servc.svc.com.worker import WorkerComponent
+from servc.svc.config import Config
+from servc.svc.io.output import InvalidInputsException, StatusCode
+
+
+class TestWorker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        config = Config()
+        cls.bus = BusRabbitMQ(config.get("conf.bus"))
+        cls.cache = CacheRedis(config.get("conf.cache"))
+        cls.worker = WorkerComponent(
+            {}, {}, None, cls.bus, BusRabbitMQ, cls.cache, config
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.worker.close()
+
+    def test_publisher_reused(self):
+        publisher = self.worker.getPublisher()
+        self.assertIs(publisher, self.worker.getPublisher())
+        self.assertIsNot(publisher, self.bus)
+
+    def test_publisher_per_thread(self):
+        publishers = []
+        thread = threading.Thread(
+            target=lambda: publishers.append(self.worker.getPublisher())
+        )
+        thread.start()
+        thread.join()
+
+        self.assertEqual(len(publishers), 1)
+        self.assertIsNot(publishers[0], self.worker.getPublisher())
+
+    def test_async_resolver(self):
+        async def resolver(_id, payload, _c):
+            await asyncio.sleep(0)
+            return payload * 2
+
+        status, response, error = asyncio.run(
+            self.worker.run_resolver_async(resolver, {}, ("1", 5))
+        )
+        self.assertEqual(status, StatusCode.OK)
+        self.assertEqual(response["responseBody"], 10)
+        self.assertIsNone(error)
+
+    def test_async_resolver_error(self):
+        async def resolver(_id, _p, _c):
+            raise InvalidInputsException("bad")
+
+        status, response, error = asyncio.run(
+            self.worker.run_resolver_async(resolver, {}, ("1", 5))
+        )
+        self.assertEqual(status, StatusCode.INVALID_INPUTS)
+        self.assertTrue(response["isError"])
+        self.assertIsInstance(error, InvalidInputsException)
+
+
+if __name__ == "__main__":
+    unittest.main()